@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Literal
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from app.services.fuzzy import fuzzy_search
 import time
 
@@ -15,6 +15,7 @@ class SearchRequest(BaseModel):
     word: str
     algorithm: Literal["levenshtein", "damerau"]
     corpus_id: int
+    top_k: Optional[int] = Field(None, ge=1)
 
 class SearchResult(BaseModel):
     word: str
@@ -31,7 +32,7 @@ def search_fuzzy(req: SearchRequest):
         raise HTTPException(status_code=404, detail="Corpus not found")
 
     start = time.time()
-    results = fuzzy_search(req.word, corpus, req.algorithm)
+    results = fuzzy_search(req.word, corpus, req.algorithm, top_k=req.top_k)
     end = time.time()
 
     return {
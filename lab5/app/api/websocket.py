@@ -1,11 +1,15 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.services.fuzzy import fuzzy_search
+from app.services.fuzzy import fuzzy_search, iter_fuzzy_search
 
 # Заглушка корпуса — в будущем заменим на БД
 FAKE_CORPUSES = {
     1: ["example", "sample", "temple", "apple", "examine"]
 }
 
+MAX_DISTANCE = 3
+# Сколько совпадений отправлять одним сообщением
+CHUNK_SIZE = 50
+
 router = APIRouter()
 
 @router.websocket("/ws/search")
@@ -17,13 +21,44 @@ async def websocket_search(websocket: WebSocket):
             word = data.get("word")
             algorithm = data.get("algorithm", "levenshtein")
             corpus_id = data.get("corpus_id", 1)
+            top_k = data.get("top_k")
+
+            # HTTP-эндпоинт проверяет top_k через схему, здесь - вручную
+            if top_k is not None and (isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1):
+                await websocket.send_json({
+                    "word": word,
+                    "error": "top_k must be a positive integer",
+                    "done": True
+                })
+                continue
 
             corpus = FAKE_CORPUSES.get(corpus_id, [])
-            results = fuzzy_search(word, corpus, algorithm)
+            if top_k is not None:
+                # Для top_k ранжирование известно только после полного прохода
+                results = fuzzy_search(word, corpus, algorithm, max_distance=MAX_DISTANCE, top_k=top_k)
+                await websocket.send_json({
+                    "word": word,
+                    "results": results,
+                    "done": True
+                })
+                continue
+
+            # Отправляем совпадения частями по мере нахождения
+            chunk = []
+            total = 0
+            for result in iter_fuzzy_search(word, corpus, algorithm, max_distance=MAX_DISTANCE):
+                chunk.append(result)
+                if len(chunk) >= CHUNK_SIZE:
+                    await websocket.send_json({"word": word, "results": chunk, "done": False})
+                    total += len(chunk)
+                    chunk = []
 
+            total += len(chunk)
             await websocket.send_json({
                 "word": word,
-                "results": results
+                "results": chunk,
+                "done": True,
+                "total": total
             })
 
     except WebSocketDisconnect:
@@ -1,3 +1,7 @@
+import heapq
+from array import array
+from itertools import repeat
+
 def levenshtein(a: str, b: str) -> int:
     if a == b:
         return 0
@@ -18,34 +22,139 @@ def levenshtein(a: str, b: str) -> int:
 
     return previous_row[-1]
 
-def damerau_levenshtein(a: str, b: str) -> int:
-    d = {}
-    lenstr1 = len(a)
-    lenstr2 = len(b)
-    for i in range(-1, lenstr1 + 1):
-        d[(i, -1)] = i + 1
-    for j in range(-1, lenstr2 + 1):
-        d[(-1, j)] = j + 1
-
-    for i in range(lenstr1):
-        for j in range(lenstr2):
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> int:
+    # Считаем только полосу шириной 2k+1 и выходим, как только вся строка > k
+    if len(a) < len(b):
+        a, b = b, a
+    over = max_distance + 1
+    if len(a) - len(b) > max_distance:
+        return over
+    if len(b) == 0:
+        return len(a)
+
+    previous_row = [j if j <= max_distance else over for j in range(len(b) + 1)]
+    current_row = [over] * (len(b) + 1)
+    for i in range(1, len(a) + 1):
+        ca = a[i - 1]
+        start = max(1, i - max_distance)
+        end = min(len(b), i + max_distance)
+        current_row[start - 1] = i if start == 1 and i <= max_distance else over
+        if end < len(b):
+            current_row[end + 1] = over
+
+        row_min = current_row[start - 1]
+        for j in range(start, end + 1):
+            dist = min(
+                previous_row[j] + 1,
+                current_row[j - 1] + 1,
+                previous_row[j - 1] + (ca != b[j - 1]),
+                over
+            )
+            current_row[j] = dist
+            if dist < row_min:
+                row_min = dist
+        if row_min > max_distance:
+            return over
+        previous_row, current_row = current_row, previous_row
+
+    return min(previous_row[len(b)], over)
+
+def damerau_levenshtein(a: str, b: str, rows: list[array] | None = None) -> int:
+    # OSA-вариант: транспозиция смотрит только на строку i - 2, поэтому
+    # достаточно трех скользящих строк. rows можно переиспользовать между вызовами
+    if rows is None:
+        rows = [array("l"), array("l"), array("l")]
+    size = len(b) + 1
+    for row in rows:
+        if len(row) < size:
+            row.extend(repeat(0, size - len(row)))
+
+    two_ago, previous_row, current_row = rows
+    for j in range(size):
+        previous_row[j] = j
+
+    for i in range(len(a)):
+        current_row[0] = i + 1
+        for j in range(len(b)):
             cost = 0 if a[i] == b[j] else 1
-            d[(i, j)] = min(
-                d[(i - 1, j)] + 1,      # удаление
-                d[(i, j - 1)] + 1,      # вставка
-                d[(i - 1, j - 1)] + cost  # замена
+            dist = min(
+                previous_row[j + 1] + 1,  # удаление
+                current_row[j] + 1,       # вставка
+                previous_row[j] + cost    # замена
             )
             if i > 0 and j > 0 and a[i] == b[j - 1] and a[i - 1] == b[j]:
-                d[(i, j)] = min(d[(i, j)], d[(i - 2, j - 2)] + cost)  # транспозиция
-    return d[(lenstr1 - 1, lenstr2 - 1)]
+                dist = min(dist, two_ago[j - 1] + cost)  # транспозиция
+            current_row[j + 1] = dist
+        two_ago, previous_row, current_row = previous_row, current_row, two_ago
+
+    return previous_row[len(b)]
+
+def _distance_function(word: str, algorithm: str):
+    # Буферы строк Дамерау-Левенштейна общие на весь поиск
+    rows = [array("l"), array("l"), array("l")]
+
+    def distance(w: str, cutoff: int | None) -> int:
+        if cutoff is None:
+            if algorithm == "levenshtein":
+                return levenshtein(word, w)
+            return damerau_levenshtein(word, w, rows)
+        # Разница длин - нижняя граница для обоих алгоритмов
+        if abs(len(word) - len(w)) > cutoff:
+            return cutoff + 1
+        if algorithm == "levenshtein":
+            return bounded_levenshtein(word, w, cutoff)
+        return damerau_levenshtein(word, w, rows)
 
-def fuzzy_search(word: str, corpus: list[str], algorithm: str = "levenshtein") -> list[dict]:
-    results = []
+    return distance
 
-    func = levenshtein if algorithm == "levenshtein" else damerau_levenshtein
 
+def iter_fuzzy_search(
+    word: str,
+    corpus: list[str],
+    algorithm: str = "levenshtein",
+    max_distance: int | None = None
+):
+    # Совпадения отдаются по мере нахождения, в порядке корпуса
+    distance = _distance_function(word, algorithm)
     for w in corpus:
-        dist = func(word, w)
-        results.append({"word": w, "distance": dist})
+        dist = distance(w, max_distance)
+        if max_distance is None or dist <= max_distance:
+            yield {"word": w, "distance": dist}
+
+
+def fuzzy_search(
+    word: str,
+    corpus: list[str],
+    algorithm: str = "levenshtein",
+    max_distance: int | None = None,
+    top_k: int | None = None
+) -> list[dict]:
+    if top_k is None:
+        results = iter_fuzzy_search(word, corpus, algorithm, max_distance)
+        return sorted(results, key=lambda x: x["distance"])
+    if top_k < 1:
+        raise ValueError("top_k must be >= 1")
+
+    distance = _distance_function(word, algorithm)
+
+    # Ограниченная куча (-расстояние, -номер, слово): в вершине худший кандидат.
+    # Когда куча заполнена, порог сужается до худшего расстояния в ней
+    heap = []
+    cutoff = max_distance
+    for i, w in enumerate(corpus):
+        dist = distance(w, cutoff)
+        if cutoff is not None and dist > cutoff:
+            continue
+        if len(heap) < top_k:
+            heapq.heappush(heap, (-dist, -i, w))
+        else:
+            heapq.heapreplace(heap, (-dist, -i, w))
+        if len(heap) == top_k:
+            cutoff = -heap[0][0] - 1
+            if cutoff < 0:
+                break
 
-    return sorted(results, key=lambda x: x["distance"])
+    return [
+        {"word": w, "distance": -dist}
+        for dist, _, w in sorted(heap, key=lambda item: (-item[0], -item[1]))
+    ]
@@ -1,19 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
 from app.schemas.user import UserCreate, UserLogin, UserResponse, UserMe
 from app.cruds.user import create_user, authenticate_user, get_user_by_email
 from app.core.security import create_access_token, get_current_user
 from app.models.user import User
+from app.services.password_hasher import PasswordHasherBusy, password_hasher
 
 router = APIRouter()
 
 
+def hasher_busy_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, try again later",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/sign-up/", response_model=UserResponse)
-def sign_up(user: UserCreate, db: Session = Depends(get_db)):
+async def sign_up(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Регистрация нового пользователя"""
     # Проверяем, не существует ли уже пользователь с таким email
-    db_user = get_user_by_email(db, email=user.email)
+    db_user = await get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -21,7 +30,10 @@ def sign_up(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Создаем нового пользователя
-    db_user = create_user(db=db, user=user)
+    try:
+        db_user = await create_user(db=db, user=user)
+    except PasswordHasherBusy:
+        raise hasher_busy_error()
     
     # Создаем токен
     access_token = create_access_token(data={"sub": str(db_user.id)})
@@ -35,10 +47,13 @@ def sign_up(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login/", response_model=UserResponse)
-def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Вход в систему"""
     # Аутентифицируем пользователя
-    db_user = authenticate_user(db, user.email, user.password)
+    try:
+        db_user = await authenticate_user(db, user.email, user.password)
+    except PasswordHasherBusy:
+        raise hasher_busy_error()
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -58,10 +73,16 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.get("/users/me/", response_model=UserMe)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user)):
     """Получение информации о текущем пользователе"""
     return UserMe(
         id=current_user.id,
         email=current_user.email,
         created_at=current_user.created_at
-    ) 
\ No newline at end of file
+    )
+
+
+@router.get("/password_hasher/stats")
+async def get_password_hasher_stats(current_user: User = Depends(get_current_user)):
+    """Возвращает глубину очереди и задержку хэширования паролей"""
+    return password_hasher.get_stats()
@@ -1,22 +1,112 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+import codecs
+import uuid
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
 from app.schemas.corpus import CorpusCreate, CorpusResponse, CorpusList, CorpusInfo
-from app.cruds.corpus import create_corpus, get_corpuses_by_user
+from app.schemas.search import WebSocketMessage
+from app.cruds.corpus import create_stored_corpus, get_corpuses_by_user, get_corpus_index_by_id, prepare_corpus_text
+from app.core.config import settings
+from app.services.corpus_store import corpus_store
+from app.services.fuzzy_search import FuzzySearchService, WordCounter
+from app.services.qgram_index import QGramIndex
+from app.services.search_executor import run_search, run_with_session
+from app.websocket.pubsub import notification_bridge
 from app.core.security import get_current_user
 from app.models.user import User
 
 router = APIRouter()
 
 
+async def notify_user(user_id: int, message: dict) -> None:
+    try:
+        await notification_bridge.apublish(user_id, message)
+    except Exception:
+        # Уведомления о прогрессе не должны срывать загрузку
+        pass
+
+
 @router.post("/upload_corpus", response_model=CorpusResponse)
-def upload_corpus(
+async def upload_corpus(
     corpus: CorpusCreate,
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Загружает корпус текста для индексации и поиска"""
-    db_corpus = create_corpus(db=db, corpus=corpus, user_id=current_user.id)
+    # Запись текста и токенизация нагружают процессор - выполняем их вне цикла событий
+    prepared = await run_in_threadpool(prepare_corpus_text, corpus.text)
+    # Вставка словаря и индекса q-грамм тоже долгая - через синхронную сессию в пуле поиска
+    db_corpus = await run_with_session(create_stored_corpus, corpus.corpus_name, current_user.id, *prepared)
+    
+    # Индекс удалений живет только в памяти процесса - при желании строим его сразу
+    if settings.symspell_build_on_upload:
+        corpus_index = await run_with_session(get_corpus_index_by_id, db_corpus.id, current_user.id)
+        await run_search(FuzzySearchService.get_symspell_index, corpus_index)
+    
+    return CorpusResponse(
+        corpus_id=db_corpus.id,
+        message="Corpus uploaded successfully"
+    )
+
+
+@router.post("/upload_corpus_stream", response_model=CorpusResponse)
+async def upload_corpus_stream(
+    request: Request,
+    corpus_name: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Потоково загружает корпус: тело запроса - текст в UTF-8, можно chunked.
+
+    Тело пишется на диск частями и токенизируется на лету, поэтому потребление
+    памяти не зависит от размера текста. Прогресс отправляется через WebSocket.
+    """
+    # Соединение с БД не держим, пока принимается тело - сессия откроется только в конце
+    upload_id = str(uuid.uuid4())
+    total_size = int(request.headers.get("content-length") or 0)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    counter = WordCounter()
+    
+    with corpus_store.open_writer() as writer:
+        def consume(data: bytes, final: bool = False):
+            writer.write(data)
+            counter.feed(decoder.decode(data, final))
+        
+        next_report = settings.upload_progress_step
+        try:
+            async for data in request.stream():
+                # Запись и токенизация блокируют - выносим их из цикла событий
+                await run_in_threadpool(consume, data)
+                if writer.size >= next_report:
+                    next_report = writer.size + settings.upload_progress_step
+                    progress_message = WebSocketMessage(
+                        status="PROGRESS",
+                        task_id=upload_id,
+                        progress=int(writer.size / total_size * 100) if total_size else None,
+                        current_word=f"received {writer.size} bytes"
+                    )
+                    await notify_user(current_user.id, progress_message.dict())
+            await run_in_threadpool(consume, b"", True)
+        except UnicodeDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Corpus text must be UTF-8"
+            )
+        content_hash, size = writer.commit()
+    
+    frequencies = counter.finish()
+    qgram_index = await run_in_threadpool(QGramIndex.build, list(frequencies), settings.qgram_size)
+    db_corpus = await run_with_session(
+        create_stored_corpus, corpus_name, current_user.id, content_hash, size, frequencies, qgram_index
+    )
+    
+    completion_message = WebSocketMessage(
+        status="COMPLETED",
+        task_id=upload_id,
+        progress=100,
+        current_word=f"received {size} bytes"
+    )
+    await notify_user(current_user.id, completion_message.dict())
     
     return CorpusResponse(
         corpus_id=db_corpus.id,
@@ -25,16 +115,22 @@ def upload_corpus(
 
 
 @router.get("/corpuses", response_model=CorpusList)
-def get_corpuses(
-    db: Session = Depends(get_db),
+async def get_corpuses(
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Возвращает список корпусов с идентификаторами"""
-    corpuses = get_corpuses_by_user(db=db, user_id=current_user.id)
+    """Возвращает страницу списка корпусов; следующая страница - по next_cursor"""
+    # Берем на одну строку больше, чтобы узнать, есть ли следующая страница
+    rows = await db.run_sync(get_corpuses_by_user, current_user.id, limit + 1, cursor)
     
     corpus_list = [
-        CorpusInfo(id=corpus.id, name=corpus.name)
-        for corpus in corpuses
+        CorpusInfo(id=corpus_id, name=name)
+        for corpus_id, name in rows[:limit]
     ]
     
-    return CorpusList(corpuses=corpus_list) 
\ No newline at end of file
+    return CorpusList(
+        corpuses=corpus_list,
+        next_cursor=corpus_list[-1].id if len(rows) > limit else None
+    )
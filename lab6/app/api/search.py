@@ -1,85 +1,537 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.schemas.search import SearchRequest, SearchResponse
-from app.cruds.corpus import get_corpus_by_id
+import json
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
+from typing import AsyncIterator, Iterator, List, Tuple, Union
+from app.schemas.search import (
+    SearchRequest, SearchResponse, SearchResult, BatchSearchRequest, BatchSearchResponse,
+    StoredSearchResult, SearchResultPage
+)
+from app.cruds.corpus import get_corpus_by_id, get_corpus_index_by_id, get_corpus_vocabulary_size
 from app.core.security import get_current_user
 from app.models.user import User
 from app.services.fuzzy_search import FuzzySearchService
-from app.celery.tasks import fuzzy_search_task
+from app.services.search_cache import search_cache
+from app.services.corpus_index import CorpusIndex
+from app.services.search_executor import run_search, run_with_session
+from app.services.result_store import result_store
+from app.services.admission import AdmissionRejected, admission_controller
+from app.celery.tasks import fuzzy_search_task, fuzzy_search_batch_task
+from app.core.config import settings
 
 router = APIRouter()
 
 
+def check_search_options(search_request: Union[SearchRequest, BatchSearchRequest]):
+    """Проверяет, что алгоритм и движок поиска поддерживаются"""
+    available_algorithms = FuzzySearchService.get_available_algorithms()
+    if search_request.algorithm not in available_algorithms:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported algorithm. Available: {available_algorithms}"
+        )
+    
+    available_engines = FuzzySearchService.get_available_engines()
+    if search_request.engine not in available_engines:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported engine. Available: {available_engines}"
+        )
+    
+    # Совместимость движка с алгоритмом проверяем до кэша: ответ из кэша не должен
+    # зависеть от того, искали ли этот запрос раньше
+    try:
+        FuzzySearchService.check_engine_options(
+            search_request.algorithm, search_request.engine, search_request.max_distance
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+async def load_corpus_index(db: AsyncSession, corpus_id: int, user_id: int, engine: str) -> CorpusIndex:
+    """Загружает индекс корпуса вне цикла событий.
+
+    Сессия обработчика закрывается - соединение возвращается в пул до начала
+    поиска, а словарь и индексы строятся через синхронную сессию в пуле поиска.
+    """
+    await db.close()
+    corpus_index = await run_with_session(get_corpus_index_by_id, corpus_id, user_id, engine)
+    if corpus_index is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Corpus not found"
+        )
+    return corpus_index
+
+
+def admission_error(exc: AdmissionRejected) -> HTTPException:
+    if exc.reason == "too_many_tasks":
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many running search tasks, try again later",
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Search queue is overloaded, try again later",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+async def enqueue_search_task(
+    db: AsyncSession, task, args: tuple, user_id: int, corpus_id: int, engine: str, queries: int
+) -> Tuple[str, str]:
+    """Выбирает очередь по размеру задачи, проверяет допуск и ставит задачу.
+
+    Возвращает (id задачи, очередь); при отказе - HTTPException с Retry-After.
+    """
+    await db.close()
+    # COUNT по словарю большого корпуса - не в потоке цикла событий
+    vocabulary_size = await run_with_session(get_corpus_vocabulary_size, corpus_id)
+    queue = admission_controller.choose_queue(engine, vocabulary_size, queries)
+    try:
+        task_id = await run_in_threadpool(admission_controller.admit, user_id, queue)
+    except AdmissionRejected as exc:
+        raise admission_error(exc)
+    try:
+        await run_in_threadpool(task.apply_async, args, task_id=task_id, queue=queue)
+    except Exception:
+        # Задача не ушла в брокер - освобождаем место пользователя
+        await run_in_threadpool(admission_controller.task_finished, user_id, task_id)
+        raise
+    return task_id, queue
+
+
 @router.post("/search_algorithm", response_model=SearchResponse)
-def search_algorithm(
+async def search_algorithm(
     search_request: SearchRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Выполняет поиск с указанным алгоритмом (синхронная версия)"""
     # Проверяем существование корпуса
-    corpus = get_corpus_by_id(db, search_request.corpus_id, current_user.id)
+    corpus = await db.run_sync(get_corpus_by_id, search_request.corpus_id, current_user.id)
     if not corpus:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Corpus not found"
         )
     
-    # Проверяем поддерживаемые алгоритмы
-    available_algorithms = FuzzySearchService.get_available_algorithms()
-    if search_request.algorithm not in available_algorithms:
+    # Проверяем поддерживаемые алгоритмы и движки
+    check_search_options(search_request)
+    
+    # Повторный запрос отдаем из кэша
+    start_time = time.time()
+    cached_results = await run_in_threadpool(
+        search_cache.get,
+        corpus.id,
+        search_request.word,
+        search_request.algorithm,
+        search_request.engine,
+        search_request.max_distance,
+        search_request.top_k
+    )
+    if cached_results is not None:
+        return SearchResponse(
+            execution_time=time.time() - start_time,
+            results=[SearchResult(**result) for result in cached_results]
+        )
+    
+    # Выполняем поиск по сохраненному словарю корпуса
+    corpus_index = await load_corpus_index(db, corpus.id, current_user.id, search_request.engine)
+    filter_stats = {}
+    try:
+        results, execution_time = await run_search(
+            FuzzySearchService.search_with_algorithm,
+            search_request.word,
+            corpus_index,
+            search_request.algorithm,
+            max_distance=search_request.max_distance,
+            engine=search_request.engine,
+            stats=filter_stats,
+            top_k=search_request.top_k
+        )
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Unsupported algorithm. Available: {available_algorithms}"
+            detail=str(e)
         )
     
-    # Выполняем поиск
-    results, execution_time = FuzzySearchService.search_with_algorithm(
+    # С бэкендом Redis обращения к кэшу блокируют - выполняем их в пуле потоков
+    await run_in_threadpool(
+        search_cache.set,
+        corpus.id,
         search_request.word,
-        corpus.text,
-        search_request.algorithm
+        search_request.algorithm,
+        search_request.engine,
+        search_request.max_distance,
+        [result.dict() for result in results],
+        search_request.top_k
     )
     
     return SearchResponse(
         execution_time=execution_time,
-        results=results
+        results=results,
+        filter_stats=filter_stats or None
     )
 
 
-@router.post("/search_algorithm_async")
-def search_algorithm_async(
+def take_matches(matches: Iterator[Tuple[str, int]]) -> Tuple[List[Tuple[str, int]], bool]:
+    """Берет из итератора до stream_chunk_size совпадений или сколько найдется
+    за stream_flush_interval секунд; второй элемент - закончился ли итератор
+    """
+    taken = []
+    deadline = time.time() + settings.stream_flush_interval
+    for match in matches:
+        taken.append(match)
+        if len(taken) >= settings.stream_chunk_size or time.time() >= deadline:
+            return taken, False
+    return taken, True
+
+
+async def stream_matches(
+    matches: Iterator[Tuple[str, int]],
+    start_time: float,
+    on_complete=None
+) -> AsyncIterator[str]:
+    """Превращает совпадения в строки NDJSON и отдает их частями.
+
+    Ленивый перебор продвигается частями в пуле поиска, а не в общем пуле
+    потоков. Часть уходит клиенту, когда накопилось stream_chunk_size
+    совпадений или прошло stream_flush_interval секунд. Последняя строка -
+    итоговый статус.
+    """
+    found: List[Tuple[str, int]] = []
+    done = False
+    while not done:
+        try:
+            taken, done = await run_search(take_matches, matches)
+        except Exception as e:
+            yield json.dumps({"status": "ERROR", "detail": str(e)}, ensure_ascii=False) + "\n"
+            return
+        found.extend(taken)
+        if taken:
+            yield "\n".join(
+                json.dumps({"word": word, "distance": distance}, ensure_ascii=False)
+                for word, distance in taken
+            ) + "\n"
+    
+    if on_complete is not None:
+        await run_in_threadpool(on_complete, found)
+    yield json.dumps({
+        "status": "COMPLETED",
+        "execution_time": time.time() - start_time,
+        "total": len(found)
+    }) + "\n"
+
+
+@router.post("/search_algorithm_stream")
+async def search_algorithm_stream(
     search_request: SearchRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Запускает асинхронный поиск с уведомлениями через WebSocket"""
-    # Проверяем существование корпуса
-    corpus = get_corpus_by_id(db, search_request.corpus_id, current_user.id)
+    """Потоковый поиск: совпадения отдаются в формате NDJSON по мере нахождения"""
+    corpus = await db.run_sync(get_corpus_by_id, search_request.corpus_id, current_user.id)
     if not corpus:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Corpus not found"
         )
     
-    # Проверяем поддерживаемые алгоритмы
-    available_algorithms = FuzzySearchService.get_available_algorithms()
-    if search_request.algorithm not in available_algorithms:
+    check_search_options(search_request)
+    
+    start_time = time.time()
+    cached_results = await run_in_threadpool(
+        search_cache.get,
+        corpus.id,
+        search_request.word,
+        search_request.algorithm,
+        search_request.engine,
+        search_request.max_distance,
+        search_request.top_k
+    )
+    if cached_results is not None:
+        matches = iter([(result["word"], result["distance"]) for result in cached_results])
+        return StreamingResponse(stream_matches(matches, start_time), media_type="application/x-ndjson")
+    
+    # Словарь загружаем до начала ответа: сессия БД закрывается раньше, чем закончится поток
+    corpus_index = await load_corpus_index(db, corpus.id, current_user.id, search_request.engine)
+    try:
+        if search_request.top_k is not None:
+            # Ранжирование top_k известно только после полного прохода
+            results, _ = await run_search(
+                FuzzySearchService.search_with_algorithm,
+                search_request.word,
+                corpus_index,
+                search_request.algorithm,
+                max_distance=search_request.max_distance,
+                engine=search_request.engine,
+                top_k=search_request.top_k
+            )
+            matches = iter([(result.word, result.distance) for result in results])
+        else:
+            matches = await run_search(
+                FuzzySearchService.iter_search,
+                search_request.word,
+                corpus_index,
+                search_request.algorithm,
+                max_distance=search_request.max_distance,
+                engine=search_request.engine
+            )
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Unsupported algorithm. Available: {available_algorithms}"
+            detail=str(e)
+        )
+    
+    def cache_results(found: List[Tuple[str, int]]):
+        # В кэше результаты хранятся в том же порядке, что и у обычного поиска
+        found.sort(key=lambda match: match[1])
+        search_cache.set(
+            corpus.id,
+            search_request.word,
+            search_request.algorithm,
+            search_request.engine,
+            search_request.max_distance,
+            [{"word": word, "distance": distance} for word, distance in found],
+            search_request.top_k
         )
     
-    # Запускаем задачу Celery
-    task = fuzzy_search_task.delay(
+    return StreamingResponse(
+        stream_matches(matches, start_time, cache_results),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.post("/search_algorithm_async")
+async def search_algorithm_async(
+    search_request: SearchRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Запускает асинхронный поиск с уведомлениями через WebSocket"""
+    # Проверяем существование корпуса
+    corpus = await db.run_sync(get_corpus_by_id, search_request.corpus_id, current_user.id)
+    if not corpus:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Corpus not found"
+        )
+    
+    # Проверяем поддерживаемые алгоритмы и движки
+    check_search_options(search_request)
+    
+    # При попадании в кэш отвечаем сразу, не ставя задачу в очередь
+    cached_results = await run_in_threadpool(
+        search_cache.get,
+        corpus.id,
         search_request.word,
         search_request.algorithm,
-        corpus.text,
-        current_user.id
+        search_request.engine,
+        search_request.max_distance,
+        search_request.top_k
+    )
+    if cached_results is not None:
+        return {
+            "message": "Search result from cache",
+            "task_id": None,
+            "status": "COMPLETED",
+            "results": cached_results
+        }
+    
+    # Запускаем задачу Celery в очереди по ее размеру
+    task_id, queue = await enqueue_search_task(
+        db,
+        fuzzy_search_task,
+        (
+            search_request.word,
+            search_request.algorithm,
+            corpus.id,
+            current_user.id,
+            search_request.engine,
+            search_request.max_distance,
+            search_request.top_k
+        ),
+        current_user.id,
+        corpus.id,
+        search_request.engine,
+        queries=1
     )
     
     return {
         "message": "Search task started",
-        "task_id": task.id,
+        "task_id": task_id,
+        "queue": queue,
+        "status": "PENDING"
+    } 
+
+
+def check_batch_size(batch_request: BatchSearchRequest):
+    """Ограничивает число слов в одном пакетном запросе"""
+    if len(batch_request.words) > settings.batch_search_max_words:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many words in batch. Maximum: {settings.batch_search_max_words}"
+        )
+
+
+@router.post("/search_algorithm_batch", response_model=BatchSearchResponse)
+async def search_algorithm_batch(
+    batch_request: BatchSearchRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Выполняет поиск списка слов по одному корпусу (синхронная версия)"""
+    corpus = await db.run_sync(get_corpus_by_id, batch_request.corpus_id, current_user.id)
+    if not corpus:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Corpus not found"
+        )
+    
+    check_search_options(batch_request)
+    check_batch_size(batch_request)
+    
+    # Словарь корпуса загружаем только если в кэше нашлись не все слова
+    start_time = time.time()
+    cached = await run_in_threadpool(
+        search_cache.get_many,
+        corpus.id,
+        batch_request.words,
+        batch_request.algorithm,
+        batch_request.engine,
+        batch_request.max_distance,
+        batch_request.top_k
+    )
+    results = {
+        word: [SearchResult(**result) for result in cached_results]
+        for word, cached_results in cached.items()
+    }
+    pending_words = [word for word in batch_request.words if word not in results]
+    
+    if pending_words:
+        corpus_index = await load_corpus_index(db, corpus.id, current_user.id, batch_request.engine)
+        try:
+            searched, _ = await run_search(
+                FuzzySearchService.batch_search,
+                pending_words,
+                corpus_index,
+                batch_request.algorithm,
+                max_distance=batch_request.max_distance,
+                engine=batch_request.engine,
+                top_k=batch_request.top_k
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        
+        def cache_results():
+            for word, word_results in searched.items():
+                search_cache.set(
+                    corpus.id,
+                    word,
+                    batch_request.algorithm,
+                    batch_request.engine,
+                    batch_request.max_distance,
+                    [result.dict() for result in word_results],
+                    batch_request.top_k
+                )
+        
+        await run_in_threadpool(cache_results)
+        results.update(searched)
+    
+    return BatchSearchResponse(
+        execution_time=time.time() - start_time,
+        results=results
+    )
+
+
+@router.post("/search_algorithm_batch_async")
+async def search_algorithm_batch_async(
+    batch_request: BatchSearchRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Запускает пакетный поиск в Celery с уведомлениями через WebSocket"""
+    corpus = await db.run_sync(get_corpus_by_id, batch_request.corpus_id, current_user.id)
+    if not corpus:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Corpus not found"
+        )
+    
+    check_search_options(batch_request)
+    check_batch_size(batch_request)
+    
+    task_id, queue = await enqueue_search_task(
+        db,
+        fuzzy_search_batch_task,
+        (
+            batch_request.words,
+            batch_request.algorithm,
+            corpus.id,
+            current_user.id,
+            batch_request.engine,
+            batch_request.max_distance,
+            batch_request.top_k
+        ),
+        current_user.id,
+        corpus.id,
+        batch_request.engine,
+        queries=len(set(FuzzySearchService.normalize_query(word) for word in batch_request.words))
+    )
+    
+    return {
+        "message": "Batch search task started",
+        "task_id": task_id,
+        "queue": queue,
         "status": "PENDING"
-    } 
\ No newline at end of file
+    }
+
+
+@router.get("/search_results/{result_ref}", response_model=SearchResultPage)
+async def get_search_results(
+    result_ref: str,
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user)
+):
+    """Возвращает страницу результатов фоновой задачи; следующая страница - по next_cursor"""
+    page = await run_in_threadpool(result_store.get_page, result_ref, current_user.id, cursor, limit)
+    if page is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Results not found"
+        )
+    total, rows = page
+    next_cursor = cursor + len(rows)
+    
+    return SearchResultPage(
+        total=total,
+        results=[
+            StoredSearchResult(query=query, word=word, distance=distance)
+            for query, word, distance in rows
+        ],
+        next_cursor=next_cursor if next_cursor < total else None
+    )
+
+
+@router.get("/admission/stats")
+async def get_admission_stats(current_user: User = Depends(get_current_user)):
+    """Возвращает задержку очередей задач и число отклоненных задач"""
+    return await run_in_threadpool(admission_controller.get_stats)
+
+
+@router.get("/search_cache/stats")
+async def get_search_cache_stats(current_user: User = Depends(get_current_user)):
+    """Возвращает счетчики кэша результатов поиска"""
+    return await run_in_threadpool(search_cache.get_stats)
\ No newline at end of file
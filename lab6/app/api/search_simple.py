@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.schemas.search import SearchRequest, SearchResponse
-from app.cruds.corpus import get_corpus_by_id
+from app.cruds.corpus import get_corpus_by_id, get_corpus_index
 from app.core.security import get_current_user
 from app.models.user import User
 from app.services.fuzzy_search import FuzzySearchService
@@ -33,14 +33,34 @@ def search_algorithm(
             detail=f"Unsupported algorithm. Available: {available_algorithms}"
         )
     
-    # Выполняем поиск
-    results, execution_time = FuzzySearchService.search_with_algorithm(
-        search_request.word,
-        corpus.text,
-        search_request.algorithm
-    )
+    # Проверяем поддерживаемые движки поиска
+    available_engines = FuzzySearchService.get_available_engines()
+    if search_request.engine not in available_engines:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported engine. Available: {available_engines}"
+        )
+    
+    # Выполняем поиск по сохраненному словарю корпуса
+    corpus_index = get_corpus_index(db, corpus, search_request.engine)
+    filter_stats = {}
+    try:
+        results, execution_time = FuzzySearchService.search_with_algorithm(
+            search_request.word,
+            corpus_index,
+            search_request.algorithm,
+            max_distance=search_request.max_distance,
+            engine=search_request.engine,
+            stats=filter_stats
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     return SearchResponse(
         execution_time=execution_time,
-        results=results
+        results=results,
+        filter_stats=filter_stats or None
     ) 
\ No newline at end of file
@@ -1,20 +1,23 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
 from app.websocket.manager import websocket_manager
-from app.core.security import verify_token
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.cruds.user import get_user_by_id
+from app.core.security import verify_token, get_current_user
+from app.db.database import AsyncSessionLocal
+from app.cruds.user import get_cached_user_by_id
+from app.models.user import User
 
 router = APIRouter()
 
 
 @router.websocket("/ws/{token}")
-async def websocket_endpoint(websocket: WebSocket, token: str, db: Session = Depends(get_db)):
+async def websocket_endpoint(websocket: WebSocket, token: str):
     """WebSocket эндпоинт для получения уведомлений"""
     try:
         # Проверяем токен
         user_id = verify_token(token)
-        user = get_user_by_id(db, user_id)
+        # Сессию закрываем сразу, чтобы соединение с БД не держалось все время жизни сокета;
+        # при попадании в кэш пользователей она вовсе не обращается к БД
+        async with AsyncSessionLocal() as db:
+            user = await get_cached_user_by_id(db, user_id)
         if not user:
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
@@ -29,7 +32,16 @@ async def websocket_endpoint(websocket: WebSocket, token: str, db: Session = Dep
                 # Можно обрабатывать входящие сообщения здесь
                 
         except WebSocketDisconnect:
+            pass
+        finally:
+            # Останавливаем задачу отправки и освобождаем очередь соединения
             websocket_manager.disconnect(websocket, user_id)
             
     except Exception as e:
-        await websocket.close(code=status.WS_1011_INTERNAL_ERROR) 
\ No newline at end of file
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+
+
+@router.get("/ws/stats")
+async def get_websocket_stats(current_user: User = Depends(get_current_user)):
+    """Возвращает глубину очередей отправки и число отброшенных сообщений"""
+    return websocket_manager.get_stats()
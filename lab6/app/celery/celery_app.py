@@ -1,4 +1,5 @@
 from celery import Celery
+from app.core.config import settings
 import os
 
 # Используем простой Redis URL для разработки
@@ -19,7 +20,10 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
+    # По умолчанию задачи идут в быструю очередь; API выбирает очередь по размеру задачи
+    task_default_queue=settings.fast_queue,
     task_routes={
-        "app.celery.tasks.fuzzy_search_task": {"queue": "search_queue"},
+        "app.celery.tasks.fuzzy_search_task": {"queue": settings.fast_queue},
+        "app.celery.tasks.fuzzy_search_batch_task": {"queue": settings.fast_queue},
     },
 ) 
\ No newline at end of file
@@ -0,0 +1,85 @@
+import time
+from app.core.config import settings
+from app.schemas.search import WebSocketMessage
+from app.websocket.pubsub import NotificationBridge, notification_bridge
+
+
+class WorkerChannel:
+    """Канал уведомлений процесса воркера: публикация в pub/sub по соединению процесса.
+
+    Соединение с брокером pub/sub создается один раз на процесс и переиспользуется
+    всеми задачами; WebSocket-соединения живут в процессах API, которые получают
+    события по подписке.
+    """
+
+    def __init__(self, bridge: NotificationBridge = notification_bridge):
+        self.bridge = bridge
+        self.errors = 0
+
+    def send(self, user_id: int, message: dict) -> bool:
+        try:
+            self.bridge.publish(user_id, message)
+            return True
+        except Exception:
+            # Недоступный pub/sub не должен ронять поиск
+            self.errors += 1
+            return False
+
+
+worker_channel = WorkerChannel()
+
+
+class ProgressReporter:
+    """Отправляет уведомления задачи, сливая частые обновления прогресса.
+
+    Прогресс уходит не чаще max_rate сообщений в секунду и только если
+    изменился процент. Промежуточные обновления отбрасываются, последнее
+    состояние (COMPLETED или ERROR) отправляется всегда; если публикация не
+    удалась, она повторяется.
+    """
+
+    def __init__(
+        self,
+        user_id: int,
+        task_id: str,
+        unit: str = "word",
+        channel: WorkerChannel = worker_channel,
+        max_rate: float = settings.progress_max_rate
+    ):
+        self.user_id = user_id
+        self.task_id = task_id
+        self.unit = unit
+        self.channel = channel
+        self.interval = 1.0 / max_rate
+        self._last_sent = 0.0
+        self._last_progress = -1
+        self.sent = 0
+        self.coalesced = 0
+
+    def send(self, message: dict) -> bool:
+        self.sent += 1
+        return self.channel.send(self.user_id, message)
+
+    def progress(self, processed: int, total: int) -> None:
+        now = time.monotonic()
+        if now - self._last_sent < self.interval:
+            self.coalesced += 1
+            return
+        progress = int(processed / total * 100) if total else 100
+        if progress == self._last_progress:
+            self.coalesced += 1
+            return
+        self._last_sent = now
+        self._last_progress = progress
+        self.send(WebSocketMessage(
+            status="PROGRESS",
+            task_id=self.task_id,
+            progress=progress,
+            current_word=f"processing {self.unit} {processed}/{total}"
+        ).dict())
+
+    def finish(self, message: dict) -> None:
+        """Отправляет итоговое сообщение, повторяя публикацию при сбое"""
+        deadline = time.monotonic() + settings.progress_final_timeout
+        while not self.send(message) and time.monotonic() < deadline:
+            time.sleep(settings.notification_retry_delay)
@@ -1,16 +1,44 @@
 from celery import current_task
 from app.celery.celery_app import celery_app
 from app.services.fuzzy_search import FuzzySearchService
-from app.websocket.manager import websocket_manager
+from app.db.database import SessionLocal
+from app.cruds.corpus import get_corpus_by_id, get_corpus_index
+from app.celery.progress import ProgressReporter
+from app.services.search_cache import search_cache
+from app.services.result_store import result_store
+from app.services.admission import admission_controller
+from app.core.config import settings
 from app.schemas.search import WebSocketMessage, SearchResult
-import asyncio
+from typing import List, Optional
 import json
+import multiprocessing
+
+
+def resolve_task_engine(engine: str) -> str:
+    """Процесс prefork-воркера - демон и не может запустить пул шардов; в нем
+    engine="parallel" заменяется на перебор в процессе - параллельность дает сам пул воркеров
+    """
+    if engine == "parallel" and multiprocessing.current_process().daemon:
+        return "brute_force"
+    return engine
 
 
 @celery_app.task(bind=True)
-def fuzzy_search_task(self, word: str, algorithm: str, corpus_text: str, user_id: int):
+def fuzzy_search_task(
+    self,
+    word: str,
+    algorithm: str,
+    corpus_id: int,
+    user_id: int,
+    engine: str = "brute_force",
+    max_distance: int = 3,
+    top_k: Optional[int] = None
+):
     """Задача для выполнения нечеткого поиска с отправкой уведомлений через WebSocket"""
     task_id = self.request.id
+    admission_controller.task_started(task_id)
+    search_engine = resolve_task_engine(engine)
+    reporter = ProgressReporter(user_id, task_id)
     
     # Отправляем уведомление о начале
     start_message = WebSocketMessage(
@@ -21,55 +49,54 @@ def fuzzy_search_task(self, word: str, algorithm: str, corpus_text: str, user_id
     )
     
     # Отправляем через WebSocket
-    asyncio.run(websocket_manager.send_message_to_user(user_id, start_message.dict()))
+    reporter.send(start_message.dict())
     
     try:
-        # Извлекаем слова для подсчета прогресса
-        words = FuzzySearchService.extract_words(corpus_text)
-        total_words = len(words)
+        # Читаем сохраненный словарь корпуса вместо повторной токенизации текста
+        db = SessionLocal()
+        try:
+            corpus = get_corpus_by_id(db, corpus_id, user_id)
+            if corpus is None:
+                raise ValueError(f"Корпус не найден: {corpus_id}")
+            corpus_index = get_corpus_index(db, corpus, search_engine)
+        finally:
+            db.close()
+        total_words = len(corpus_index)
         
         # Выполняем поиск с отправкой прогресса
-        results = []
-        query_word = word.lower()
+        results, execution_time = FuzzySearchService.search_with_algorithm(
+            word,
+            corpus_index,
+            algorithm,
+            max_distance=max_distance,
+            engine=search_engine,
+            progress_callback=reporter.progress,
+            top_k=top_k
+        )
         
-        for i, corpus_word in enumerate(words):
-            # Вычисляем расстояние
-            if algorithm == "levenshtein":
-                distance = FuzzySearchService.levenshtein_distance(query_word, corpus_word)
-            elif algorithm == "damerau_levenshtein":
-                distance = FuzzySearchService.damerau_levenshtein_distance(query_word, corpus_word)
-            else:
-                raise ValueError(f"Неподдерживаемый алгоритм: {algorithm}")
-            
-            if distance <= 3:  # Максимальное расстояние
-                results.append(SearchResult(word=corpus_word, distance=distance))
-            
-            # Отправляем прогресс каждые 10% или каждые 100 слов
-            if i % max(1, total_words // 10) == 0 or i % 100 == 0:
-                progress = int((i + 1) / total_words * 100)
-                progress_message = WebSocketMessage(
-                    status="PROGRESS",
-                    task_id=task_id,
-                    progress=progress,
-                    current_word=f"processing word {i + 1}/{total_words}"
-                )
-                asyncio.run(websocket_manager.send_message_to_user(user_id, progress_message.dict()))
+        search_cache.set(
+            corpus_id, word, algorithm, engine, max_distance, [result.dict() for result in results], top_k
+        )
         
-        # Сортируем результаты
-        results.sort(key=lambda x: x.distance)
+        # Полные результаты - в хранилище; брокер и WebSocket получают только ссылку
+        result_store.put(task_id, user_id, [(None, result.word, result.distance) for result in results])
+        inline = len(results) <= settings.result_inline_limit
         
         # Отправляем результат
         completion_message = WebSocketMessage(
             status="COMPLETED",
             task_id=task_id,
-            execution_time=0.0,  # Будет вычислено на клиенте
-            results=results
+            execution_time=execution_time,
+            results=results if inline else None,
+            result_ref=task_id,
+            total=len(results)
         )
         
-        asyncio.run(websocket_manager.send_message_to_user(user_id, completion_message.dict()))
+        reporter.finish(completion_message.dict())
         
         return {
-            "results": [result.dict() for result in results],
+            "result_ref": task_id,
+            "total": len(results),
             "total_processed": total_words
         }
         
@@ -81,5 +108,103 @@ def fuzzy_search_task(self, word: str, algorithm: str, corpus_text: str, user_id
             word=word,
             algorithm=algorithm
         )
-        asyncio.run(websocket_manager.send_message_to_user(user_id, error_message.dict()))
-        raise e 
\ No newline at end of file
+        reporter.finish(error_message.dict())
+        raise e
+    finally:
+        admission_controller.task_finished(user_id, task_id)
+
+
+@celery_app.task(bind=True)
+def fuzzy_search_batch_task(
+    self,
+    words: List[str],
+    algorithm: str,
+    corpus_id: int,
+    user_id: int,
+    engine: str = "brute_force",
+    max_distance: int = 3,
+    top_k: Optional[int] = None
+):
+    """Задача пакетного поиска: корпус загружается один раз на все слова пакета"""
+    task_id = self.request.id
+    admission_controller.task_started(task_id)
+    search_engine = resolve_task_engine(engine)
+    # Прогресс считается по запросам пакета, а не по словам корпуса
+    reporter = ProgressReporter(user_id, task_id, unit="query")
+    
+    start_message = WebSocketMessage(
+        status="STARTED",
+        task_id=task_id,
+        algorithm=algorithm
+    )
+    reporter.send(start_message.dict())
+    
+    try:
+        # Слова, уже найденные ранее, берем из кэша
+        batch_results = {
+            word: [SearchResult(**result) for result in cached_results]
+            for word, cached_results in search_cache.get_many(
+                corpus_id, words, algorithm, engine, max_distance, top_k
+            ).items()
+        }
+        pending_words = [word for word in words if word not in batch_results]
+        execution_time = 0.0
+        
+        if pending_words:
+            db = SessionLocal()
+            try:
+                corpus = get_corpus_by_id(db, corpus_id, user_id)
+                if corpus is None:
+                    raise ValueError(f"Корпус не найден: {corpus_id}")
+                corpus_index = get_corpus_index(db, corpus, search_engine)
+            finally:
+                db.close()
+            
+            searched, execution_time = FuzzySearchService.batch_search(
+                pending_words,
+                corpus_index,
+                algorithm,
+                max_distance=max_distance,
+                engine=search_engine,
+                progress_callback=reporter.progress,
+                top_k=top_k
+            )
+            for word, results in searched.items():
+                search_cache.set(
+                    corpus_id, word, algorithm, engine, max_distance, [result.dict() for result in results], top_k
+                )
+            batch_results.update(searched)
+        
+        rows = [
+            (word, result.word, result.distance)
+            for word, results in batch_results.items()
+            for result in results
+        ]
+        result_store.put(task_id, user_id, rows)
+        inline = len(rows) <= settings.result_inline_limit
+        
+        completion_message = WebSocketMessage(
+            status="COMPLETED",
+            task_id=task_id,
+            execution_time=execution_time,
+            batch_results=batch_results if inline else None,
+            result_ref=task_id,
+            total=len(rows)
+        )
+        reporter.finish(completion_message.dict())
+        
+        return {
+            "result_ref": task_id,
+            "total": len(rows)
+        }
+        
+    except Exception as e:
+        error_message = WebSocketMessage(
+            status="ERROR",
+            task_id=task_id,
+            algorithm=algorithm
+        )
+        reporter.finish(error_message.dict())
+        raise e
+    finally:
+        admission_controller.task_finished(user_id, task_id)
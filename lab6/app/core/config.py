@@ -7,8 +7,77 @@ class Settings(BaseSettings):
     secret_key: str = "your-secret-key-here-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    bcrypt_rounds: int = 12
+    # Пул процессов для bcrypt: параллельность и сколько запросов может ждать сверх нее
+    password_hash_workers: int = 2
+    password_hash_max_queue: int = 64
+    # Кэш пользователей для аутентификации: memory | redis | none
+    user_cache_backend: str = "memory"
+    user_cache_size: int = 10_000
+    user_cache_ttl: int = 60
+    token_cache_size: int = 10_000
     database_url: str = "sqlite:///./app.db"
+    # Пул соединений; для SQLite дополнительно включается WAL
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    sqlite_busy_timeout: int = 5000
+    sqlite_cache_size_kb: int = 65536
     redis_url: str = "redis://localhost:6379/0"
+    # Уведомления о прогрессе задач: не чаще стольких сообщений в секунду
+    progress_max_rate: float = 5.0
+    progress_final_timeout: float = 5.0
+    # Доставка уведомлений между процессами: redis | memory (только в пределах процесса)
+    notification_backend: str = "redis"
+    notification_retry_delay: float = 1.0
+    # Очереди задач поиска: небольшие поиски - в быструю, полный просмотр больших
+    # словарей - в медленную (стоимость = слов в словаре x запросов)
+    fast_queue: str = "search_fast"
+    bulk_queue: str = "search_bulk"
+    bulk_lane_min_cost: int = 200_000
+    fast_lane_concurrency: int = 4
+    fast_lane_prefetch: int = 4
+    bulk_lane_concurrency: int = 1  # пул solo: больше одной задачи он не выполняет
+    bulk_lane_prefetch: int = 1
+    # Допуск задач: redis | memory (только в пределах процесса) | none
+    admission_backend: str = "redis"
+    max_tasks_per_user: int = 4
+    queue_latency_target: float = 10.0
+    # Сколько задача может числиться за пользователем, если воркер ее потерял
+    task_slot_ttl: int = 600
+    # Очередь отправки WebSocket-соединения: сколько сообщений может ждать медленный клиент
+    ws_queue_size: int = 64
+    ws_send_timeout: float = 10.0
+    corpus_storage_dir: str = "./corpus_store"
+    # Результаты фоновых задач хранятся отдельно от брокера; в уведомление попадают
+    # только если строк не больше result_inline_limit
+    result_storage_dir: str = "./result_store"
+    result_compression_level: int = 1  # 0 - без сжатия
+    # Строк в независимо сжатом блоке: страница распаковывает только свои блоки
+    result_block_rows: int = 1000
+    result_ttl: int = 86400
+    result_inline_limit: int = 100
+    # Потоковая загрузка: как часто (в байтах) сообщать о прогрессе через WebSocket
+    upload_progress_step: int = 8 * 1024 * 1024
+    corpus_index_cache_size: int = 16
+    qgram_size: int = 2
+    symspell_max_distance: int = 2
+    symspell_max_entries: int = 20_000_000
+    symspell_build_on_upload: bool = False
+    # memory | redis | none
+    search_cache_backend: str = "memory"
+    search_cache_size: int = 1024
+    search_cache_ttl: int = 300
+    parallel_workers: int = 4
+    # Словари меньше этого размера ищутся в одном процессе
+    parallel_min_vocabulary: int = 200_000
+    batch_search_max_words: int = 1000
+    # Потоки для поиска из асинхронных обработчиков, отдельно от общего пула FastAPI
+    search_threads: int = 4
+    # Потоковый поиск: сколько совпадений и секунд копить перед отправкой части ответа
+    stream_chunk_size: int = 64
+    stream_flush_interval: float = 0.2
     
     class Config:
         env_file = ".env"
@@ -3,10 +3,11 @@ from typing import Optional
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
-from app.db.database import get_db
-from app.cruds.user import get_user_by_id
+from app.db.database import get_async_db
+from app.cruds.user import get_cached_user_by_id
+from app.services.user_cache import user_cache
 
 security = HTTPBearer()
 
@@ -23,6 +24,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 
 def verify_token(token: str):
+    # Подпись уже проверенного и не истекшего токена не проверяем повторно
+    user_id = user_cache.get_token_user_id(token)
+    if user_id is not None:
+        return user_id
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         user_id: int = payload.get("sub")
@@ -32,7 +37,8 @@ def verify_token(token: str):
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return user_id
+        user_cache.set_token_user_id(token, int(user_id), payload["exp"])
+        return int(user_id)
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -41,12 +47,12 @@ def verify_token(token: str):
         )
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     user_id = verify_token(credentials.credentials)
-    user = get_user_by_id(db, user_id)
+    user = await get_cached_user_by_id(db, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
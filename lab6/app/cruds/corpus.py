@@ -1,27 +1,218 @@
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.models.corpus import Corpus
+import numpy as np
+from app.core.config import settings
+from app.models.corpus import Corpus, CorpusFile, CorpusWord, CorpusQGram
 from app.schemas.corpus import CorpusCreate
-from typing import List
+from app.services.fuzzy_search import FuzzySearchService
+from app.services.corpus_index import CorpusIndex, corpus_index_registry
+from app.services.corpus_store import corpus_store
+from app.services.qgram_index import QGramIndex
+from app.services.search_cache import search_cache
+from typing import Dict, Iterator, List, Optional, Tuple
 
 
 def create_corpus(db: Session, corpus: CorpusCreate, user_id: int) -> Corpus:
+    return create_stored_corpus(db, corpus.corpus_name, user_id, *prepare_corpus_text(corpus.text))
+
+
+def prepare_corpus_text(text: str) -> Tuple[str, int, Dict[str, int], QGramIndex]:
+    """Сохраняет текст в хранилище и строит словарь и индекс q-грамм; к БД не обращается"""
+    # Текст уходит в файловое хранилище, в БД остаются только метаданные и хэш
+    content_hash, size = corpus_store.put_text(text)
+    # Токенизируем текст один раз и сохраняем словарь и индекс q-грамм вместе с корпусом
+    frequencies = FuzzySearchService.count_words(text)
+    return content_hash, size, frequencies, QGramIndex.build(list(frequencies), settings.qgram_size)
+
+
+def create_stored_corpus(
+    db: Session,
+    name: str,
+    user_id: int,
+    content_hash: str,
+    size: int,
+    frequencies: Dict[str, int],
+    qgram_index: Optional[QGramIndex] = None
+) -> Corpus:
+    """Регистрирует корпус, текст которого уже записан в хранилище и токенизирован"""
     db_corpus = Corpus(
-        name=corpus.corpus_name,
-        text=corpus.text,
+        name=name,
         user_id=user_id
     )
     db.add(db_corpus)
+    db.flush()
+    db.add(CorpusFile(corpus_id=db_corpus.id, content_hash=content_hash, size=size))
+    
+    save_corpus_vocabulary(db, db_corpus.id, frequencies)
+    if qgram_index is None:
+        qgram_index = QGramIndex.build(list(frequencies), settings.qgram_size)
+    save_qgram_index(db, db_corpus.id, qgram_index)
+    
     db.commit()
     db.refresh(db_corpus)
+    
+    # id удаленного корпуса может быть выдан повторно - сбрасываем все, что было под ним
+    invalidate_corpus_caches(db_corpus.id)
     return db_corpus
 
 
-def get_corpuses_by_user(db: Session, user_id: int) -> List[Corpus]:
-    return db.query(Corpus).filter(Corpus.user_id == user_id).all()
+def invalidate_corpus_caches(corpus_id: int) -> None:
+    corpus_index_registry.invalidate(corpus_id)
+    search_cache.invalidate_corpus(corpus_id)
+
+
+def get_corpus_file(db: Session, corpus_id: int) -> Optional[CorpusFile]:
+    return db.query(CorpusFile).filter(CorpusFile.corpus_id == corpus_id).first()
+
+
+def iter_corpus_text(db: Session, corpus: Corpus) -> Iterator[str]:
+    """Отдает текст корпуса частями из файлового хранилища"""
+    corpus_file = get_corpus_file(db, corpus.id)
+    if corpus_file is not None:
+        return corpus_store.iter_text(corpus_file.content_hash)
+    # Корпус загружен до появления хранилища - текст лежит в самой строке
+    return iter([corpus.text])
+
+
+def save_corpus_vocabulary(db: Session, corpus_id: int, frequencies: Dict[str, int]) -> None:
+    if not frequencies:
+        return
+    db.execute(
+        insert(CorpusWord),
+        [
+            {"corpus_id": corpus_id, "word": word, "frequency": frequency}
+            for word, frequency in frequencies.items()
+        ]
+    )
+
+
+def get_corpus_vocabulary(db: Session, corpus: Corpus) -> Dict[str, int]:
+    # Порядок по id совпадает с порядком вставки - на него ссылается индекс q-грамм
+    rows = db.query(CorpusWord.word, CorpusWord.frequency).filter(
+        CorpusWord.corpus_id == corpus.id
+    ).order_by(CorpusWord.id).all()
+    if rows:
+        return {word: frequency for word, frequency in rows}
+    
+    # Корпус загружен до появления словаря - строим его один раз и сохраняем
+    frequencies = FuzzySearchService.count_words_stream(iter_corpus_text(db, corpus))
+    try:
+        save_corpus_vocabulary(db, corpus.id, frequencies)
+        db.commit()
+    except IntegrityError:
+        # Словарь одновременно сохранил другой процесс - читаем его версию
+        db.rollback()
+        return get_corpus_vocabulary(db, corpus)
+    return frequencies
+
+
+def get_corpus_vocabulary_shard(db: Session, corpus_id: int, shard: int, shard_count: int) -> Dict[str, int]:
+    """Часть словаря корпуса: слова, у которых id % shard_count == shard.
+
+    Слова словаря вставляются одним пакетом с идущими подряд id, поэтому шарды
+    получаются равными, а каждый воркер читает из БД только свои строки.
+    """
+    rows = db.query(CorpusWord.word, CorpusWord.frequency).filter(
+        CorpusWord.corpus_id == corpus_id,
+        CorpusWord.id % shard_count == shard
+    ).order_by(CorpusWord.id).all()
+    return {word: frequency for word, frequency in rows}
+
+
+def get_corpus_vocabulary_size(db: Session, corpus_id: int) -> int:
+    """Число слов словаря без загрузки самого словаря; 0 - словарь еще не построен"""
+    return db.query(func.count(CorpusWord.id)).filter(CorpusWord.corpus_id == corpus_id).scalar()
+
+
+def save_qgram_index(db: Session, corpus_id: int, qgram_index: QGramIndex) -> None:
+    if not len(qgram_index):
+        return
+    db.execute(
+        insert(CorpusQGram),
+        [
+            {"corpus_id": corpus_id, "q": qgram_index.q, "gram": gram, "postings": positions.tobytes()}
+            for gram, positions in qgram_index.items()
+        ]
+    )
+
+
+def load_qgram_index(db: Session, corpus_id: int, word_count: int) -> Optional[QGramIndex]:
+    """Сохраненный индекс q-грамм или None, если его нет или он построен для другого q"""
+    rows = db.query(CorpusQGram.q, CorpusQGram.gram, CorpusQGram.postings).filter(
+        CorpusQGram.corpus_id == corpus_id
+    ).all()
+    if not rows or rows[0].q != settings.qgram_size:
+        return None
+    postings = {
+        gram: np.frombuffer(positions, dtype=np.int32)
+        for _, gram, positions in rows
+    }
+    return QGramIndex(settings.qgram_size, word_count, postings)
+
+
+def get_qgram_index(db: Session, corpus_id: int, words: List[str]) -> QGramIndex:
+    qgram_index = load_qgram_index(db, corpus_id, len(words))
+    if qgram_index is not None:
+        return qgram_index
+    
+    # Индекса нет или он построен для другого q - перестраиваем и сохраняем
+    qgram_index = QGramIndex.build(words, settings.qgram_size)
+    try:
+        db.query(CorpusQGram).filter(CorpusQGram.corpus_id == corpus_id).delete()
+        save_qgram_index(db, corpus_id, qgram_index)
+        db.commit()
+    except IntegrityError:
+        # Индекс одновременно перестроил другой процесс - читаем его версию, а если
+        # он построен с другими настройками, используем свой без сохранения
+        db.rollback()
+        stored_index = load_qgram_index(db, corpus_id, len(words))
+        return stored_index if stored_index is not None else qgram_index
+    return qgram_index
+
+
+def get_corpus_version(corpus: Corpus) -> str:
+    return str(corpus.created_at)
+
+
+def get_corpus_index(db: Session, corpus: Corpus, engine: str = "brute_force") -> CorpusIndex:
+    corpus_index = corpus_index_registry.load(
+        corpus.id,
+        lambda: get_corpus_vocabulary(db, corpus),
+        get_corpus_version(corpus)
+    )
+    if engine == "qgram":
+        # Сохраненный индекс q-грамм подгружаем только когда он нужен
+        corpus_index.get_structure("qgram", lambda: get_qgram_index(db, corpus.id, corpus_index.words))
+    return corpus_index
+
+
+def get_corpus_index_by_id(
+    db: Session, corpus_id: int, user_id: int, engine: str = "brute_force"
+) -> Optional[CorpusIndex]:
+    """Индекс корпуса пользователя или None, если корпуса нет"""
+    corpus = get_corpus_by_id(db, corpus_id, user_id)
+    if corpus is None:
+        return None
+    return get_corpus_index(db, corpus, engine)
+
+
+def get_corpuses_by_user(
+    db: Session, user_id: int, limit: int, after_id: Optional[int] = None
+) -> List[Tuple[int, str]]:
+    """Возвращает страницу (id, name) корпусов пользователя после корпуса after_id.
+
+    Читаются только нужные колонки, а постраничность по id (keyset) не
+    требует OFFSET и использует индекс (user_id, id).
+    """
+    query = db.query(Corpus.id, Corpus.name).filter(Corpus.user_id == user_id)
+    if after_id is not None:
+        query = query.filter(Corpus.id > after_id)
+    return query.order_by(Corpus.id).limit(limit).all()
 
 
 def get_corpus_by_id(db: Session, corpus_id: int, user_id: int) -> Corpus:
     return db.query(Corpus).filter(
         Corpus.id == corpus_id, 
         Corpus.user_id == user_id
-    ).first() 
\ No newline at end of file
+    ).first()
@@ -1,9 +1,10 @@
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
 from app.schemas.user import UserCreate
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.services.user_cache import user_cache
+from app.services.password_hasher import password_hasher, pwd_context
 
 
 def get_password_hash(password: str) -> str:
@@ -14,30 +15,43 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def get_user_by_email(db: Session, email: str) -> User:
-    return db.query(User).filter(User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str) -> User:
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+
+async def get_user_by_id(db: AsyncSession, user_id: int) -> User:
+    return await db.get(User, int(user_id))
 
 
-def get_user_by_id(db: Session, user_id: int) -> User:
-    return db.query(User).filter(User.id == user_id).first()
+async def get_cached_user_by_id(db: AsyncSession, user_id: int) -> User:
+    """Возвращает пользователя из кэша; к БД обращается только при промахе"""
+    # Бэкенд кэша может быть Redis - его синхронные вызовы не должны блокировать цикл событий
+    user = await run_in_threadpool(user_cache.get_user, user_id)
+    if user is None:
+        user = await get_user_by_id(db, user_id)
+        if user is not None:
+            await run_in_threadpool(user_cache.set_user, user)
+    return user
 
 
-def create_user(db: Session, user: UserCreate) -> User:
-    hashed_password = get_password_hash(user.password)
+async def create_user(db: AsyncSession, user: UserCreate) -> User:
+    # bcrypt намеренно медленный - считаем хэш в отдельном пуле процессов
+    hashed_password = await password_hasher.hash(user.password)
     db_user = User(
         email=user.email,
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
-def authenticate_user(db: Session, email: str, password: str) -> User:
-    user = get_user_by_email(db, email)
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> User:
+    user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await password_hasher.verify(password, user.hashed_password):
         return None
-    return user 
\ No newline at end of file
+    return user
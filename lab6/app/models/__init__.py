@@ -1,4 +1,4 @@
 from .user import User
-from .corpus import Corpus
+from .corpus import Corpus, CorpusFile, CorpusWord, CorpusQGram
 
-__all__ = ["User", "Corpus"] 
\ No newline at end of file
+__all__ = ["User", "Corpus", "CorpusFile", "CorpusWord", "CorpusQGram"]
\ No newline at end of file
@@ -1,16 +1,54 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import (
+    BigInteger, Column, Integer, String, Text, DateTime, ForeignKey, Index, UniqueConstraint, LargeBinary
+)
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from app.db.database import Base
 
 
 class Corpus(Base):
     __tablename__ = "corpuses"
+    # Список корпусов пользователя читается постранично по id
+    __table_args__ = (Index("ix_corpuses_user_id_id", "user_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    text = Column(Text, nullable=False)
+    # Текст хранится в CorpusStore (см. CorpusFile); колонка осталась для корпусов,
+    # загруженных раньше, и не читается вместе со строкой
+    text = deferred(Column(Text, nullable=False, default=""))
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    user = relationship("User") 
\ No newline at end of file
+    user = relationship("User")
+
+
+class CorpusFile(Base):
+    """Ссылка на текст корпуса в файловом хранилище: хэш содержимого и размер в байтах"""
+    __tablename__ = "corpus_files"
+
+    corpus_id = Column(Integer, ForeignKey("corpuses.id", ondelete="CASCADE"), primary_key=True)
+    content_hash = Column(String(64), nullable=False, index=True)
+    size = Column(BigInteger, nullable=False)
+
+
+class CorpusWord(Base):
+    """Словарь корпуса: уникальные слова с частотами, строится при загрузке"""
+    __tablename__ = "corpus_words"
+    __table_args__ = (UniqueConstraint("corpus_id", "word"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    corpus_id = Column(Integer, ForeignKey("corpuses.id", ondelete="CASCADE"), nullable=False, index=True)
+    word = Column(String, nullable=False)
+    frequency = Column(Integer, nullable=False, default=1)
+
+
+class CorpusQGram(Base):
+    """Инвертированный индекс q-грамм: позиции слов словаря корпуса (порядок по CorpusWord.id)"""
+    __tablename__ = "corpus_qgrams"
+    __table_args__ = (UniqueConstraint("corpus_id", "gram"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    corpus_id = Column(Integer, ForeignKey("corpuses.id", ondelete="CASCADE"), nullable=False, index=True)
+    q = Column(Integer, nullable=False)
+    gram = Column(String, nullable=False)
+    postings = Column(LargeBinary, nullable=False)
@@ -1,9 +1,13 @@
 from .user import UserCreate, UserLogin, UserResponse, UserMe
 from .corpus import CorpusCreate, CorpusResponse, CorpusList, CorpusInfo
-from .search import SearchRequest, SearchResponse, SearchResult, WebSocketMessage
+from .search import (
+    SearchRequest, SearchResponse, SearchResult, BatchSearchRequest, BatchSearchResponse, WebSocketMessage,
+    StoredSearchResult, SearchResultPage
+)
 
 __all__ = [
     "UserCreate", "UserLogin", "UserResponse", "UserMe",
     "CorpusCreate", "CorpusResponse", "CorpusList", "CorpusInfo",
-    "SearchRequest", "SearchResponse", "SearchResult", "WebSocketMessage"
+    "SearchRequest", "SearchResponse", "SearchResult", "BatchSearchRequest", "BatchSearchResponse",
+    "WebSocketMessage", "StoredSearchResult", "SearchResultPage"
 ] 
\ No newline at end of file
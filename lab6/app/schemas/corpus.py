@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -26,4 +26,6 @@ class CorpusInfo(BaseModel):
 
 
 class CorpusList(BaseModel):
-    corpuses: List[CorpusInfo] 
\ No newline at end of file
+    corpuses: List[CorpusInfo]
+    # id последнего корпуса страницы; None - страниц больше нет
+    next_cursor: Optional[int] = None 
\ No newline at end of file
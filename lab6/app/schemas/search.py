@@ -1,11 +1,23 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 
 
 class SearchRequest(BaseModel):
     word: str
     algorithm: str
     corpus_id: int
+    engine: str = "brute_force"
+    max_distance: int = Field(3, ge=0)
+    top_k: Optional[int] = Field(None, ge=1)
+
+
+class BatchSearchRequest(BaseModel):
+    words: List[str] = Field(..., min_length=1)
+    algorithm: str
+    corpus_id: int
+    engine: str = "brute_force"
+    max_distance: int = Field(3, ge=0)
+    top_k: Optional[int] = Field(None, ge=1)
 
 
 class SearchResult(BaseModel):
@@ -13,9 +25,26 @@ class SearchResult(BaseModel):
     distance: int
 
 
+class StoredSearchResult(SearchResult):
+    # Для пакетных задач - запрос, к которому относится результат
+    query: Optional[str] = None
+
+
+class SearchResultPage(BaseModel):
+    total: int
+    results: List[StoredSearchResult]
+    next_cursor: Optional[int] = None
+
+
 class SearchResponse(BaseModel):
     execution_time: float
     results: List[SearchResult]
+    filter_stats: Optional[Dict[str, int]] = None
+
+
+class BatchSearchResponse(BaseModel):
+    execution_time: float
+    results: Dict[str, List[SearchResult]]
 
 
 class WebSocketMessage(BaseModel):
@@ -26,4 +55,8 @@ class WebSocketMessage(BaseModel):
     progress: Optional[int] = None
     current_word: Optional[str] = None
     execution_time: Optional[float] = None
-    results: Optional[List[SearchResult]] = None 
\ No newline at end of file
+    results: Optional[List[SearchResult]] = None
+    batch_results: Optional[Dict[str, List[SearchResult]]] = None
+    # Ссылка на полные результаты в хранилище и их число
+    result_ref: Optional[str] = None
+    total: Optional[int] = None 
\ No newline at end of file
@@ -0,0 +1,241 @@
+import math
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+from app.core.config import settings
+
+# Движки, которые проверяют только кандидатов из индекса, а не весь словарь
+INDEXED_ENGINES = ("bk_tree", "qgram", "symspell")
+
+
+class AdmissionRejected(Exception):
+    """Задачу нельзя принять сейчас: retry_after - через сколько секунд повторить"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class InMemoryAdmissionBackend:
+    """Множества с оценками в памяти процесса: для тестов и запуска без Redis.
+
+    Задачи, завершенные в другом процессе, здесь не видны и освобождаются
+    только по task_slot_ttl, поэтому с отдельными воркерами Celery нужен Redis.
+    """
+
+    def __init__(self):
+        self._sets: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, member: str, score: float) -> None:
+        with self._lock:
+            self._sets.setdefault(key, {})[member] = score
+
+    def add_bounded(self, key: str, member: str, score: float, min_score: float, limit: int) -> bool:
+        with self._lock:
+            members = self._sets.setdefault(key, {})
+            for expired in [expired for expired, value in members.items() if value < min_score]:
+                del members[expired]
+            members[member] = score
+            if len(members) > limit:
+                del members[member]
+                return False
+            return True
+
+    def remove(self, key: str, member: str) -> None:
+        with self._lock:
+            self._sets.get(key, {}).pop(member, None)
+
+    def prune(self, key: str, min_score: float) -> None:
+        with self._lock:
+            members = self._sets.get(key, {})
+            for member in [member for member, score in members.items() if score < min_score]:
+                del members[member]
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            return len(self._sets.get(key, {}))
+
+    def min_score(self, key: str) -> Optional[float]:
+        with self._lock:
+            return min(self._sets.get(key, {}).values(), default=None)
+
+
+class RedisAdmissionBackend:
+    """Множества с оценками в Redis (sorted set) - общие для всех API и воркеров"""
+
+    # Очистка, добавление и проверка размера одним скриптом - атомарно для всех API
+    ADD_BOUNDED_SCRIPT = """
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[1])
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[3])
+    if redis.call('ZCARD', KEYS[1]) > tonumber(ARGV[4]) then
+        redis.call('ZREM', KEYS[1], ARGV[3])
+        return 0
+    end
+    return 1
+    """
+
+    def __init__(self, redis_url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(redis_url)
+        self._add_bounded = self.client.register_script(self.ADD_BOUNDED_SCRIPT)
+
+    def add(self, key: str, member: str, score: float) -> None:
+        self.client.zadd(key, {member: score})
+
+    def add_bounded(self, key: str, member: str, score: float, min_score: float, limit: int) -> bool:
+        return bool(self._add_bounded(keys=[key], args=[min_score, score, member, limit]))
+
+    def remove(self, key: str, member: str) -> None:
+        self.client.zrem(key, member)
+
+    def prune(self, key: str, min_score: float) -> None:
+        self.client.zremrangebyscore(key, "-inf", f"({min_score}")
+
+    def count(self, key: str) -> int:
+        return self.client.zcard(key)
+
+    def min_score(self, key: str) -> Optional[float]:
+        items = self.client.zrange(key, 0, 0, withscores=True)
+        return items[0][1] if items else None
+
+
+class AdmissionController:
+    """Распределение задач поиска по очередям и допуск новых задач.
+
+    Для каждой очереди хранится время постановки ждущих задач: задержка очереди -
+    возраст самой старой из них, и она растет, даже если воркеры встали. Для
+    пользователя хранятся его незавершенные задачи со сроком task_slot_ttl.
+    Задача не принимается, если у пользователя уже max_tasks_per_user задач или
+    задержка ее очереди выше цели; клиент получает время, через которое повторить.
+    Если хранилище недоступно, задачи принимаются без проверок.
+    """
+
+    def __init__(self, backend, max_tasks_per_user: int, latency_target: float, slot_ttl: int):
+        self.backend = backend
+        self.max_tasks_per_user = max_tasks_per_user
+        self.latency_target = latency_target
+        self.slot_ttl = slot_ttl
+        self.queues = (settings.fast_queue, settings.bulk_queue)
+        self.admitted = 0
+        self.rejected_user = 0
+        self.rejected_latency = 0
+        self.errors = 0
+
+    @staticmethod
+    def choose_queue(engine: str, vocabulary_size: int, queries: int = 1) -> str:
+        if vocabulary_size == 0:
+            # Словарь еще не построен - задаче придется прочитать весь текст корпуса
+            return settings.bulk_queue
+        if engine == "parallel":
+            # Шардированный поиск запускает свой пул процессов - это возможно только
+            # в воркере медленной очереди (пул solo), см. start_celery.py
+            return settings.bulk_queue
+        if engine in INDEXED_ENGINES:
+            return settings.fast_queue
+        if vocabulary_size * queries >= settings.bulk_lane_min_cost:
+            return settings.bulk_queue
+        return settings.fast_queue
+
+    def _queue_key(self, queue: str) -> str:
+        return f"admission:queued:{queue}"
+
+    def _user_key(self, user_id: int) -> str:
+        return f"admission:user:{user_id}"
+
+    def queue_latency(self, queue: str, now: Optional[float] = None) -> float:
+        now = now or time.time()
+        key = self._queue_key(queue)
+        # Потерянные задачи не должны навсегда завышать задержку
+        self.backend.prune(key, now - self.slot_ttl)
+        oldest = self.backend.min_score(key)
+        return max(0.0, now - oldest) if oldest is not None else 0.0
+
+    def admit(self, user_id: int, queue: str) -> str:
+        """Проверяет, можно ли поставить задачу, и возвращает ее id"""
+        task_id = str(uuid.uuid4())
+        if self.backend is None:
+            return task_id
+        now = time.time()
+        try:
+            user_key = self._user_key(user_id)
+            # Слот занимается вместе с проверкой лимита, иначе параллельные запросы
+            # видят одно и то же число задач и проходят все
+            if not self.backend.add_bounded(
+                user_key, task_id, now + self.slot_ttl, now, self.max_tasks_per_user
+            ):
+                self.rejected_user += 1
+                raise AdmissionRejected("too_many_tasks", 1)
+            latency = self.queue_latency(queue, now)
+            if latency > self.latency_target:
+                self.backend.remove(user_key, task_id)
+                self.rejected_latency += 1
+                raise AdmissionRejected("queue_latency", math.ceil(latency - self.latency_target))
+            # Регистрируем до отправки: воркер может взять задачу раньше, чем вернется apply_async
+            self.backend.add(self._queue_key(queue), task_id, now)
+        except AdmissionRejected:
+            raise
+        except Exception:
+            # Недоступное хранилище не должно останавливать поиск
+            self.errors += 1
+        self.admitted += 1
+        return task_id
+
+    def task_started(self, task_id: str) -> None:
+        if self.backend is None:
+            return
+        try:
+            for queue in self.queues:
+                self.backend.remove(self._queue_key(queue), task_id)
+        except Exception:
+            self.errors += 1
+
+    def task_finished(self, user_id: int, task_id: str) -> None:
+        if self.backend is None:
+            return
+        try:
+            for queue in self.queues:
+                self.backend.remove(self._queue_key(queue), task_id)
+            self.backend.remove(self._user_key(user_id), task_id)
+        except Exception:
+            self.errors += 1
+
+    def get_stats(self) -> dict:
+        stats = {
+            "admitted": self.admitted,
+            "rejected_user": self.rejected_user,
+            "rejected_latency": self.rejected_latency,
+            "errors": self.errors,
+            "latency_target": self.latency_target,
+        }
+        if self.backend is not None:
+            try:
+                stats["queues"] = {
+                    queue: {
+                        "queued": self.backend.count(self._queue_key(queue)),
+                        "latency": self.queue_latency(queue),
+                    }
+                    for queue in self.queues
+                }
+            except Exception:
+                self.errors += 1
+        return stats
+
+
+def create_admission_backend():
+    if settings.admission_backend == "redis":
+        return RedisAdmissionBackend(settings.redis_url)
+    if settings.admission_backend == "memory":
+        return InMemoryAdmissionBackend()
+    return None
+
+
+admission_controller = AdmissionController(
+    create_admission_backend(),
+    settings.max_tasks_per_user,
+    settings.queue_latency_target,
+    settings.task_slot_ttl
+)
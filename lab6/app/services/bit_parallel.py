@@ -0,0 +1,70 @@
+from typing import Dict, Optional
+
+
+class BitParallelMatcher:
+    """Бит-параллельное расстояние Левенштейна (Myers, 1999).
+
+    С transpositions=True используется расширение Hyyrö (2003), которое
+    считает ограниченное расстояние Дамерау-Левенштейна (OSA). Битовые маски
+    запроса строятся один раз и переиспользуются для всего словаря.
+    Целые числа Python не ограничены 64 битами, поэтому длинные запросы
+    тоже поддерживаются, хотя и медленнее.
+    """
+
+    def __init__(self, query: str, transpositions: bool = False):
+        self.query = query
+        self.transpositions = transpositions
+        self.length = len(query)
+        self.full_mask = (1 << self.length) - 1
+        self.last_bit = 1 << (self.length - 1) if self.length else 0
+
+        # Маска позиций каждого символа в запросе
+        self.peq: Dict[str, int] = {}
+        for i, c in enumerate(query):
+            self.peq[c] = self.peq.get(c, 0) | (1 << i)
+
+    def distance(self, word: str, max_distance: Optional[int] = None) -> int:
+        """Возвращает расстояние до слова; при заданном пороге - не больше max_distance + 1"""
+        m, n = self.length, len(word)
+        if max_distance is not None and abs(m - n) > max_distance:
+            return max_distance + 1
+        if m == 0:
+            return n if max_distance is None else min(n, max_distance + 1)
+
+        peq = self.peq
+        full_mask = self.full_mask
+        last_bit = self.last_bit
+        transpositions = self.transpositions
+
+        vp, vn = full_mask, 0
+        d0, previous_eq = 0, 0
+        score = m
+        remaining = n
+        for c in word:
+            eq = peq.get(c, 0)
+            previous_d0 = d0
+            d0 = ((((eq & vp) + vp) ^ vp) | eq | vn) & full_mask
+            if transpositions:
+                d0 |= ((~previous_d0 & eq) << 1) & previous_eq
+            hp = vn | (~(d0 | vp) & full_mask)
+            hn = d0 & vp
+
+            if hp & last_bit:
+                score += 1
+            elif hn & last_bit:
+                score -= 1
+
+            hp = ((hp << 1) | 1) & full_mask
+            hn = (hn << 1) & full_mask
+            vp = hn | (~(d0 | hp) & full_mask)
+            vn = hp & d0
+            previous_eq = eq
+
+            # Каждый оставшийся символ уменьшает итог не более чем на 1
+            remaining -= 1
+            if max_distance is not None and score - remaining > max_distance:
+                return max_distance + 1
+
+        if max_distance is not None and score > max_distance:
+            return max_distance + 1
+        return score
@@ -0,0 +1,64 @@
+from typing import Callable, Iterable, List, Optional, Tuple
+
+
+class BKTree:
+    """BK-дерево для поиска слов в радиусе заданного расстояния.
+
+    Работает с любой метрикой (Левенштейн, Дамерау-Левенштейн): при поиске
+    поддеревья отсекаются по неравенству треугольника.
+    """
+
+    def __init__(self, distance_function: Callable[[str, str], int]):
+        self.distance_function = distance_function
+        # Узел - пара (слово, {расстояние: дочерний узел})
+        self.root: Optional[Tuple[str, dict]] = None
+        self.size = 0
+
+    @classmethod
+    def build(cls, words: Iterable[str], distance_function: Callable[[str, str], int]) -> "BKTree":
+        tree = cls(distance_function)
+        for word in words:
+            tree.add(word)
+        return tree
+
+    def add(self, word: str) -> None:
+        if self.root is None:
+            self.root = (word, {})
+            self.size = 1
+            return
+
+        node_word, children = self.root
+        while True:
+            distance = self.distance_function(word, node_word)
+            if distance == 0:
+                return
+            child = children.get(distance)
+            if child is None:
+                children[distance] = (word, {})
+                self.size += 1
+                return
+            node_word, children = child
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[str, int]]:
+        """Возвращает пары (слово, расстояние) с расстоянием не больше max_distance"""
+        if self.root is None:
+            return []
+
+        results = []
+        stack = [self.root]
+        while stack:
+            node_word, children = stack.pop()
+            distance = self.distance_function(word, node_word)
+            if distance <= max_distance:
+                results.append((node_word, distance))
+
+            # Неравенство треугольника: искомые слова лежат только в поддеревьях
+            # с ребрами из [distance - max_distance, distance + max_distance]
+            low, high = distance - max_distance, distance + max_distance
+            for edge, child in children.items():
+                if low <= edge <= high:
+                    stack.append(child)
+        return results
+
+    def __len__(self) -> int:
+        return self.size
@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from app.core.config import settings
+
+
+class CorpusIndex:
+    """Словарь корпуса в памяти и построенные по нему поисковые структуры"""
+
+    def __init__(self, corpus_id: int, frequencies: Dict[str, int], version: str = ""):
+        self.corpus_id = corpus_id
+        # Отличает корпус от другого, получившего тот же id после удаления
+        self.version = version
+        self.frequencies = frequencies
+        self.words = list(frequencies)
+        self._structures: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get_structure(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Возвращает структуру по имени, при первом обращении строит ее"""
+        structure = self._structures.get(name)
+        if structure is None:
+            with self._lock:
+                structure = self._structures.get(name)
+                if structure is None:
+                    structure = factory()
+                    self._structures[name] = structure
+        return structure
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+
+class CorpusIndexRegistry:
+    """Кэш индексов корпусов в процессе (LRU по количеству корпусов)"""
+
+    def __init__(self, max_corpora: int):
+        self.max_corpora = max_corpora
+        self._indexes: "OrderedDict[int, CorpusIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Загрузка одного корпуса выполняется одним потоком, остальные ждут ее результата
+        self._load_locks: Dict[int, threading.Lock] = {}
+
+    def get(self, corpus_id: int) -> Optional[CorpusIndex]:
+        with self._lock:
+            index = self._indexes.get(corpus_id)
+            if index is not None:
+                self._indexes.move_to_end(corpus_id)
+            return index
+
+    def load(self, corpus_id: int, loader: Callable[[], Dict[str, int]], version: str = "") -> CorpusIndex:
+        """Возвращает индекс корпуса, при промахе загружает словарь через loader"""
+        index = self.get(corpus_id)
+        if index is not None and index.version == version:
+            return index
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(corpus_id, threading.Lock())
+        with load_lock:
+            # Пока ждали, словарь мог загрузить другой поток
+            index = self.get(corpus_id)
+            if index is not None and index.version == version:
+                return index
+
+            index = CorpusIndex(corpus_id, loader(), version)
+            with self._lock:
+                self._indexes[corpus_id] = index
+                self._indexes.move_to_end(corpus_id)
+                while len(self._indexes) > self.max_corpora:
+                    evicted_id, _ = self._indexes.popitem(last=False)
+                    self._load_locks.pop(evicted_id, None)
+        return index
+
+    def invalidate(self, corpus_id: int) -> None:
+        with self._lock:
+            self._indexes.pop(corpus_id, None)
+
+
+corpus_index_registry = CorpusIndexRegistry(settings.corpus_index_cache_size)
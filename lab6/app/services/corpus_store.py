@@ -0,0 +1,94 @@
+import codecs
+import hashlib
+import os
+import tempfile
+from typing import Iterator, Optional, Tuple
+from app.core.config import settings
+
+
+class CorpusWriter:
+    """Записывает текст корпуса во временный файл, считая хэш содержимого на лету.
+
+    После commit файл переносится в хранилище под именем своего хэша; если такое
+    содержимое уже сохранено, временный файл просто удаляется.
+    """
+
+    def __init__(self, store: "CorpusStore"):
+        self.store = store
+        os.makedirs(store.temp_dir, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(dir=store.temp_dir)
+        self._file = os.fdopen(fd, "wb")
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.content_hash: Optional[str] = None
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._hash.update(data)
+        self.size += len(data)
+
+    def commit(self) -> Tuple[str, int]:
+        self._file.close()
+        self.content_hash = self._hash.hexdigest()
+        path = self.store.path(self.content_hash)
+        if os.path.exists(path):
+            os.remove(self.temp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Переименование атомарно: читатели не увидят недописанный файл
+            os.replace(self.temp_path, path)
+        return self.content_hash, self.size
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def __enter__(self) -> "CorpusWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.content_hash is None:
+            self.abort()
+
+
+class CorpusStore:
+    """Файловое хранилище текстов корпусов с адресацией по SHA-256 содержимого"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.temp_dir = os.path.join(root, "tmp")
+
+    def path(self, content_hash: str) -> str:
+        # Подкаталоги по первым символам хэша, чтобы не копить файлы в одном каталоге
+        return os.path.join(self.root, content_hash[:2], content_hash)
+
+    def exists(self, content_hash: str) -> bool:
+        return os.path.exists(self.path(content_hash))
+
+    def open_writer(self) -> CorpusWriter:
+        return CorpusWriter(self)
+
+    def put_text(self, text: str) -> Tuple[str, int]:
+        with self.open_writer() as writer:
+            writer.write(text.encode("utf-8"))
+            return writer.commit()
+
+    def iter_text(self, content_hash: str, chunk_size: int = 1 << 20) -> Iterator[str]:
+        """Читает текст частями, не загружая файл целиком"""
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        with open(self.path(content_hash), "rb") as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                # Многобайтовый символ на границе части декодер доберет со следующей
+                text = decoder.decode(data)
+                if text:
+                    yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+
+corpus_store = CorpusStore(settings.corpus_storage_dir)
@@ -0,0 +1,77 @@
+from array import array
+from itertools import repeat
+from typing import Optional
+
+
+class DamerauLevenshteinMatcher:
+    """Расстояние Дамерау-Левенштейна (без ограничения на транспозиции)
+    от запроса до слов словаря.
+
+    Матрица хранится в плоском массиве array('l'), который переиспользуется
+    между вызовами в рамках одного поиска. Полная матрица нужна потому, что
+    транспозиция может ссылаться на любую из предыдущих строк.
+    """
+
+    def __init__(self, query: str):
+        self.query = query
+        self._matrix = array('l')
+
+    def distance(self, word: str, max_distance: Optional[int] = None) -> int:
+        """Возвращает расстояние до слова; при заданном пороге - не больше max_distance + 1"""
+        s1, s2 = self.query, word
+        len1, len2 = len(s1), len(s2)
+        if max_distance is not None and abs(len1 - len2) > max_distance:
+            return max_distance + 1
+
+        # Строка i матрицы H[-1..len1, -1..len2] начинается с (i + 1) * width
+        width = len2 + 2
+        size = (len1 + 2) * width
+        H = self._matrix
+        if len(H) < size:
+            H.extend(repeat(0, size - len(H)))
+
+        maxdist = len1 + len2
+        H[0] = maxdist
+        for i in range(0, len1 + 1):
+            H[(i + 1) * width] = maxdist
+            H[(i + 1) * width + 1] = i
+        for j in range(0, len2 + 1):
+            H[j + 1] = maxdist
+            H[width + j + 1] = j
+
+        # Последняя строка, в которой встречался символ (по умолчанию 0)
+        last_row = {}
+        for i in range(1, len1 + 1):
+            c1 = s1[i - 1]
+            row = (i + 1) * width
+            above = i * width
+            last_match_col = 0
+            row_min = i
+            for j in range(1, len2 + 1):
+                c2 = s2[j - 1]
+                i1 = last_row.get(c2, 0)
+                j1 = last_match_col
+                cost = 1
+                if c1 == c2:
+                    cost = 0
+                    last_match_col = j
+
+                distance = min(
+                    H[above + j + 1] + 1,       # insertion
+                    H[row + j] + 1,             # deletion
+                    H[above + j] + cost,        # substitution
+                    H[i1 * width + j1] + (i - i1 - 1) + 1 + (j - j1 - 1)  # transposition
+                )
+                H[row + j + 1] = distance
+                if distance < row_min:
+                    row_min = distance
+
+            # Вся строка вышла за порог - итоговое расстояние тоже больше порога
+            if max_distance is not None and row_min > max_distance:
+                return max_distance + 1
+            last_row[c1] = i
+
+        result = H[(len1 + 1) * width + len2 + 1]
+        if max_distance is not None and result > max_distance:
+            return max_distance + 1
+        return result
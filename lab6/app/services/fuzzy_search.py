@@ -1,10 +1,63 @@
+import heapq
 import re
 import time
-from typing import List, Tuple, Dict
+from collections import Counter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from app.schemas.search import SearchResult
+from app.services.bit_parallel import BitParallelMatcher
+from app.services.bk_tree import BKTree
+from app.services.damerau import DamerauLevenshteinMatcher
+from app.services.corpus_index import CorpusIndex
+from app.services.numpy_batch import NumpyBatchIndex
+from app.services.prefilter import CandidateFilter
+from app.services.qgram_index import QGramIndex
+from app.services.symspell import SymSpellIndex
+from app.services.parallel_search import sharded_search_pool
+from app.core.config import settings
+
+WORD_PATTERN = re.compile(r'\b\w+\b')
+
+
+class WordCounter:
+    """Инкрементальный подсчет частот слов для текста, поступающего частями"""
+
+    def __init__(self):
+        self.counter = Counter()
+        self.tail = ""
+
+    def feed(self, chunk: str) -> None:
+        text = self.tail + chunk.lower()
+        # Слово в конце части может продолжаться в следующей - откладываем его
+        end = len(text)
+        while end and (text[end - 1].isalnum() or text[end - 1] == "_"):
+            end -= 1
+        self.counter.update(WORD_PATTERN.findall(text, 0, end))
+        self.tail = text[end:]
+
+    def finish(self) -> Dict[str, int]:
+        self.counter.update(WORD_PATTERN.findall(self.tail))
+        self.tail = ""
+        return dict(self.counter)
 
 
 class FuzzySearchService:
+    # Бит-параллельные алгоритмы: имя -> учитывать ли транспозиции (OSA)
+    BIT_PARALLEL_ALGORITHMS = {
+        "levenshtein_bitparallel": False,
+        "osa_bitparallel": True,
+    }
+    # Алгоритмы, удовлетворяющие неравенству треугольника
+    METRIC_ALGORITHMS = ("levenshtein", "damerau_levenshtein", "levenshtein_bitparallel")
+    # Алгоритмы с транспозициями: одна правка может разрушить на одну q-грамму больше
+    TRANSPOSITION_ALGORITHMS = ("damerau_levenshtein", "osa_bitparallel")
+    # Алгоритмы векторизованного движка: имя -> учитывать ли транспозиции (OSA)
+    NUMPY_BATCH_ALGORITHMS = {
+        "levenshtein": False,
+        "levenshtein_bitparallel": False,
+        "osa_bitparallel": True,
+    }
+    # Движки, которые отбирают кандидатов и проверяют их перебором
+    SCAN_ENGINES = ("brute_force", "qgram", "symspell")
     
     @staticmethod
     def levenshtein_distance(s1: str, s2: str) -> int:
@@ -28,88 +81,465 @@ class FuzzySearchService:
         return previous_row[-1]
 
     @staticmethod
-    def damerau_levenshtein_distance(s1: str, s2: str) -> int:
-        """Вычисляет расстояние Дамерау-Левенштейна между двумя строками"""
+    def bounded_levenshtein_distance(s1: str, s2: str, max_distance: int) -> int:
+        """Расстояние Левенштейна с порогом: считает только диагональную полосу
+        шириной 2k+1 и возвращает max_distance + 1, как только порог превышен"""
+        if len(s1) < len(s2):
+            s1, s2 = s2, s1
+
         len1, len2 = len(s1), len(s2)
+        over = max_distance + 1
         
-        # Создаем матрицу
-        H = {}
-        maxdist = len1 + len2
-        H[-1, -1] = maxdist
-        
-        # Инициализация первой строки и столбца
-        for i in range(0, len1 + 1):
-            H[i, -1] = maxdist
-            H[i, 0] = i
-        for j in range(0, len2 + 1):
-            H[-1, j] = maxdist
-            H[0, j] = j
+        # Разница длин - нижняя граница расстояния
+        if len1 - len2 > max_distance:
+            return over
+        if len2 == 0:
+            return len1
+
+        previous_row = [j if j <= max_distance else over for j in range(len2 + 1)]
+        current_row = [over] * (len2 + 1)
+        for i in range(1, len1 + 1):
+            c1 = s1[i - 1]
+            start = max(1, i - max_distance)
+            end = min(len2, i + max_distance)
             
-        # Словарь для отслеживания последнего вхождения символов
-        last_row = {}
-        for c in s1 + s2:
-            last_row[c] = 0
+            # Ячейки за пределами полосы заведомо больше порога
+            current_row[start - 1] = i if start == 1 and i <= max_distance else over
+            if end < len2:
+                current_row[end + 1] = over
             
-        for i in range(1, len1 + 1):
-            last_match_col = 0
-            for j in range(1, len2 + 1):
-                i1 = last_row[s2[j-1]]
-                j1 = last_match_col
-                cost = 1
-                if s1[i-1] == s2[j-1]:
-                    cost = 0
-                    last_match_col = j
-                    
-                H[i, j] = min(
-                    H[i-1, j] + 1,     # insertion
-                    H[i, j-1] + 1,     # deletion
-                    H[i-1, j-1] + cost, # substitution
-                    H[i1-1, j1-1] + (i-i1-1) + 1 + (j-j1-1) # transposition
-                )
-                
-            last_row[s1[i-1]] = i
+            row_min = current_row[start - 1]
+            for j in range(start, end + 1):
+                distance = previous_row[j - 1] + (c1 != s2[j - 1])
+                insertion = previous_row[j] + 1
+                deletion = current_row[j - 1] + 1
+                if insertion < distance:
+                    distance = insertion
+                if deletion < distance:
+                    distance = deletion
+                if distance > over:
+                    distance = over
+                current_row[j] = distance
+                if distance < row_min:
+                    row_min = distance
             
-        return H[len1, len2]
+            # Вся строка вышла за порог - дальше расстояние только растет
+            if row_min > max_distance:
+                return over
+            previous_row, current_row = current_row, previous_row
+        
+        return min(previous_row[len2], over)
+
+    @staticmethod
+    def damerau_levenshtein_distance(s1: str, s2: str) -> int:
+        """Вычисляет расстояние Дамерау-Левенштейна между двумя строками"""
+        return DamerauLevenshteinMatcher(s1).distance(s2)
+
+    @staticmethod
+    def bounded_damerau_levenshtein_distance(s1: str, s2: str, max_distance: int) -> int:
+        """Расстояние Дамерау-Левенштейна с порогом: пары с разницей длин
+        больше порога отбрасываются без заполнения матрицы, а заполнение
+        прекращается, как только вся строка матрицы превысила порог"""
+        return DamerauLevenshteinMatcher(s1).distance(s2, max_distance)
 
     @staticmethod
     def extract_words(text: str) -> List[str]:
         """Извлекает слова из текста"""
-        words = re.findall(r'\b\w+\b', text.lower())
+        words = WORD_PATTERN.findall(text.lower())
         return list(set(words))  # Убираем дубликаты
 
+    @staticmethod
+    def count_words(text: str) -> Dict[str, int]:
+        """Извлекает уникальные слова из текста вместе с их частотами"""
+        return dict(Counter(WORD_PATTERN.findall(text.lower())))
+
+    @staticmethod
+    def count_words_stream(chunks: Iterable[str]) -> Dict[str, int]:
+        """Считает частоты слов по частям текста, не собирая его целиком.
+
+        Порядок слов и частоты совпадают с count_words для склеенного текста.
+        """
+        counter = WordCounter()
+        for chunk in chunks:
+            counter.feed(chunk)
+        return counter.finish()
+
+    @staticmethod
+    def normalize_query(word: str) -> str:
+        """Приводит поисковый запрос к виду, в котором хранится словарь"""
+        return word.strip().lower()
+
+    @staticmethod
+    def get_distance_function(algorithm: str) -> Callable[[str, str], int]:
+        """Возвращает функцию расстояния для указанного алгоритма"""
+        if algorithm == "levenshtein":
+            return FuzzySearchService.levenshtein_distance
+        if algorithm == "damerau_levenshtein":
+            return FuzzySearchService.damerau_levenshtein_distance
+        if algorithm in FuzzySearchService.BIT_PARALLEL_ALGORITHMS:
+            transpositions = FuzzySearchService.BIT_PARALLEL_ALGORITHMS[algorithm]
+            return lambda s1, s2: BitParallelMatcher(s1, transpositions).distance(s2)
+        raise ValueError(f"Неподдерживаемый алгоритм: {algorithm}")
+
+    @staticmethod
+    def get_bounded_distance_function(algorithm: str) -> Callable[[str, str, int], int]:
+        """Возвращает функцию расстояния с порогом для указанного алгоритма"""
+        if algorithm == "levenshtein":
+            return FuzzySearchService.bounded_levenshtein_distance
+        if algorithm == "damerau_levenshtein":
+            return FuzzySearchService.bounded_damerau_levenshtein_distance
+        if algorithm in FuzzySearchService.BIT_PARALLEL_ALGORITHMS:
+            transpositions = FuzzySearchService.BIT_PARALLEL_ALGORITHMS[algorithm]
+            return lambda s1, s2, max_distance: BitParallelMatcher(s1, transpositions).distance(s2, max_distance)
+        raise ValueError(f"Неподдерживаемый алгоритм: {algorithm}")
+
+    @staticmethod
+    def create_matcher(algorithm: str, query_word: str) -> Callable[[str, int], int]:
+        """Готовит функцию расстояния от запроса до слова словаря с порогом.
+
+        Для бит-параллельных алгоритмов маски запроса строятся один раз на поиск.
+        """
+        if algorithm in FuzzySearchService.BIT_PARALLEL_ALGORITHMS:
+            transpositions = FuzzySearchService.BIT_PARALLEL_ALGORITHMS[algorithm]
+            return BitParallelMatcher(query_word, transpositions).distance
+        if algorithm == "damerau_levenshtein":
+            # Буфер матрицы переиспользуется для всего словаря
+            return DamerauLevenshteinMatcher(query_word).distance
+        bounded_distance = FuzzySearchService.get_bounded_distance_function(algorithm)
+        return lambda word, max_distance: bounded_distance(query_word, word, max_distance)
+
+    @staticmethod
+    def check_engine_options(algorithm: str, engine: str, max_distance: int) -> None:
+        """Проверяет, что движок поддерживает алгоритм и порог; при несовместимости - ValueError.
+
+        Проверка не зависит от корпуса, поэтому ее можно выполнить до чтения кэша.
+        """
+        if engine == "bk_tree" and algorithm not in FuzzySearchService.METRIC_ALGORITHMS:
+            raise ValueError(f"BK-дерево требует метрику, алгоритм {algorithm} не подходит")
+        if engine == "numpy_batch" and algorithm not in FuzzySearchService.NUMPY_BATCH_ALGORITHMS:
+            raise ValueError(f"Векторизованный движок не поддерживает алгоритм {algorithm}")
+        if engine == "symspell" and max_distance > settings.symspell_max_distance:
+            raise ValueError(
+                f"Индекс SymSpell построен для расстояния не больше {settings.symspell_max_distance}"
+            )
+
     @staticmethod
     def search_with_algorithm(
         query_word: str, 
-        corpus_text: str, 
+        corpus_index: CorpusIndex, 
         algorithm: str,
-        max_distance: int = 3
+        max_distance: int = 3,
+        engine: str = "brute_force",
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        stats: Optional[Dict[str, int]] = None,
+        top_k: Optional[int] = None
     ) -> Tuple[List[SearchResult], float]:
-        """Выполняет поиск с указанным алгоритмом"""
+        """Выполняет поиск с указанным алгоритмом по словарю корпуса.
+
+        Если передан словарь stats, в него записывается, сколько кандидатов
+        отсеял каждый фильтр перед полным перебором. При заданном top_k
+        возвращаются только top_k ближайших слов.
+        """
         start_time = time.time()
         
-        words = FuzzySearchService.extract_words(corpus_text)
-        results = []
+        FuzzySearchService.check_engine_options(algorithm, engine, max_distance)
+        query_word = FuzzySearchService.normalize_query(query_word)
         
-        query_word = query_word.lower()
+        engine = FuzzySearchService._resolve_engine(engine, corpus_index)
         
-        for word in words:
-            if algorithm == "levenshtein":
-                distance = FuzzySearchService.levenshtein_distance(query_word, word)
-            elif algorithm == "damerau_levenshtein":
-                distance = FuzzySearchService.damerau_levenshtein_distance(query_word, word)
-            else:
-                raise ValueError(f"Неподдерживаемый алгоритм: {algorithm}")
-            
-            if distance <= max_distance:
-                results.append(SearchResult(word=word, distance=distance))
+        if engine in FuzzySearchService.SCAN_ENGINES:
+            matches = FuzzySearchService._scan(
+                FuzzySearchService._select_candidates(
+                    query_word, corpus_index, algorithm, max_distance, engine, stats
+                ),
+                FuzzySearchService.create_matcher(algorithm, query_word),
+                max_distance,
+                progress_callback,
+                top_k
+            )
+        elif engine == "bk_tree":
+            # Для отсечения по неравенству треугольника нужны точные расстояния
+            distance_function = FuzzySearchService.get_distance_function(algorithm)
+            tree = corpus_index.get_structure(
+                f"bk_tree:{algorithm}",
+                lambda: BKTree.build(corpus_index.words, distance_function)
+            )
+            matches = tree.search(query_word, max_distance)
+        elif engine == "parallel":
+            matches = sharded_search_pool.search(
+                corpus_index.corpus_id,
+                corpus_index.version,
+                query_word,
+                algorithm,
+                max_distance,
+                top_k,
+                stats
+            )
+            if progress_callback is not None:
+                progress_callback(len(corpus_index), len(corpus_index))
+        elif engine == "numpy_batch":
+            batch_index = corpus_index.get_structure(
+                "numpy_batch",
+                lambda: NumpyBatchIndex(corpus_index.words)
+            )
+            matches = batch_index.search(
+                query_word,
+                max_distance,
+                FuzzySearchService.NUMPY_BATCH_ALGORITHMS[algorithm]
+            )
+        else:
+            raise ValueError(f"Неподдерживаемый движок поиска: {engine}")
+        
+        results = FuzzySearchService._build_results(matches, top_k)
+        
+        execution_time = time.time() - start_time
+        return results, execution_time
+
+    @staticmethod
+    def _build_results(matches: List[Tuple[str, int]], top_k: Optional[int]) -> List[SearchResult]:
+        if top_k is not None and len(matches) > top_k:
+            # Индексные движки и объединенные шарды дают лишнее - выбираем лучшие через ограниченную кучу
+            matches = heapq.nsmallest(top_k, matches, key=lambda match: match[1])
+        
+        results = [SearchResult(word=word, distance=distance) for word, distance in matches]
         
         # Сортируем по расстоянию
         results.sort(key=lambda x: x.distance)
+        return results
+
+    @staticmethod
+    def iter_search(
+        query_word: str,
+        corpus_index: CorpusIndex,
+        algorithm: str,
+        max_distance: int = 3,
+        engine: str = "brute_force",
+        stats: Optional[Dict[str, int]] = None
+    ) -> Iterator[Tuple[str, int]]:
+        """Возвращает итератор совпадений (слово, расстояние) в порядке словаря.
+
+        Перебирающие движки проверяют кандидатов лениво, и совпадения доступны
+        по мере нахождения. Индексные движки находят все совпадения сразу.
+        Ошибки параметров поиска возникают при вызове, а не при итерации.
+        """
+        FuzzySearchService.check_engine_options(algorithm, engine, max_distance)
+        query_word = FuzzySearchService.normalize_query(query_word)
+        engine = FuzzySearchService._resolve_engine(engine, corpus_index)
+        
+        if engine not in FuzzySearchService.SCAN_ENGINES:
+            results, _ = FuzzySearchService.search_with_algorithm(
+                query_word, corpus_index, algorithm, max_distance, engine, stats=stats
+            )
+            return iter([(result.word, result.distance) for result in results])
+        
+        candidates = FuzzySearchService._select_candidates(
+            query_word, corpus_index, algorithm, max_distance, engine, stats
+        )
+        return FuzzySearchService._iter_scan(
+            candidates,
+            FuzzySearchService.create_matcher(algorithm, query_word),
+            max_distance
+        )
+
+    @staticmethod
+    def batch_search(
+        query_words: List[str],
+        corpus_index: CorpusIndex,
+        algorithm: str,
+        max_distance: int = 3,
+        engine: str = "brute_force",
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        top_k: Optional[int] = None
+    ) -> Tuple[Dict[str, List[SearchResult]], float]:
+        """Выполняет поиск нескольких слов по одному словарю корпуса.
+
+        Структуры корпуса (фильтр кандидатов, индексы) строятся один раз на весь
+        пакет, а запросы, совпадающие после нормализации, ищутся один раз.
+        Для перебора отбор кандидатов общий на пакет: гистограммы запросов
+        считаются одним проходом, запросы одной длины делят выборку словаря.
+        Сопоставители (битовые маски, буферы) зависят от запроса и строятся для
+        каждого. Результаты возвращаются для каждого исходного слова.
+        """
+        start_time = time.time()
+        
+        FuzzySearchService.check_engine_options(algorithm, engine, max_distance)
+        unique_queries = {}
+        for word in query_words:
+            unique_queries.setdefault(FuzzySearchService.normalize_query(word), []).append(word)
+        
+        shared_candidates = None
+        if FuzzySearchService._resolve_engine(engine, corpus_index) == "brute_force":
+            shared_candidates = FuzzySearchService._get_candidate_filter(corpus_index).filter_many(
+                list(unique_queries), max_distance
+            )
+        
+        results = {}
+        total = len(unique_queries)
+        for i, (query, words) in enumerate(unique_queries.items()):
+            if shared_candidates is not None:
+                query_results = FuzzySearchService._build_results(
+                    FuzzySearchService._scan(
+                        shared_candidates[i],
+                        FuzzySearchService.create_matcher(algorithm, query),
+                        max_distance,
+                        None,
+                        top_k
+                    ),
+                    top_k
+                )
+            else:
+                query_results, _ = FuzzySearchService.search_with_algorithm(
+                    query,
+                    corpus_index,
+                    algorithm,
+                    max_distance=max_distance,
+                    engine=engine,
+                    top_k=top_k
+                )
+            for word in words:
+                results[word] = query_results
+            if progress_callback is not None:
+                progress_callback(i + 1, total)
         
         execution_time = time.time() - start_time
         return results, execution_time
 
+    @staticmethod
+    def get_symspell_index(corpus_index: CorpusIndex) -> SymSpellIndex:
+        """Возвращает индекс удалений корпуса, при первом обращении строит его"""
+        return corpus_index.get_structure(
+            "symspell",
+            lambda: SymSpellIndex.build(
+                corpus_index.words,
+                settings.symspell_max_distance,
+                settings.symspell_max_entries
+            )
+        )
+
+    @staticmethod
+    def _get_candidate_filter(corpus_index: CorpusIndex) -> CandidateFilter:
+        return corpus_index.get_structure(
+            "candidate_filter",
+            lambda: CandidateFilter(corpus_index.words)
+        )
+
+    @staticmethod
+    def _resolve_engine(engine: str, corpus_index: CorpusIndex) -> str:
+        if engine == "parallel" and len(corpus_index) < settings.parallel_min_vocabulary:
+            # Небольшой словарь быстрее перебрать в текущем процессе
+            return "brute_force"
+        return engine
+
+    @staticmethod
+    def _select_candidates(
+        query_word: str,
+        corpus_index: CorpusIndex,
+        algorithm: str,
+        max_distance: int,
+        engine: str,
+        stats: Optional[Dict[str, int]] = None
+    ) -> List[str]:
+        """Отбирает слова словаря, которые нужно проверить полным расчетом расстояния"""
+        if engine == "brute_force":
+            # Отсекаем кандидатов по длине и гистограмме символов до запуска динамики
+            return FuzzySearchService._get_candidate_filter(corpus_index).filter(query_word, max_distance, stats)
+        if engine == "qgram":
+            qgram_index = corpus_index.get_structure(
+                "qgram",
+                lambda: QGramIndex.build(corpus_index.words, settings.qgram_size)
+            )
+            positions = qgram_index.candidates(
+                query_word,
+                max_distance,
+                algorithm in FuzzySearchService.TRANSPOSITION_ALGORITHMS
+            )
+            if positions is None:
+                # Запрос слишком короткий для леммы - остаются только дешевые фильтры
+                return FuzzySearchService._get_candidate_filter(corpus_index).filter(
+                    query_word, max_distance, stats
+                )
+            candidates = [corpus_index.words[i] for i in positions]
+            if stats is not None:
+                stats["total"] = len(corpus_index)
+                stats["qgram_filter"] = len(corpus_index) - len(candidates)
+                stats["verified"] = len(candidates)
+            return candidates
+        if engine == "symspell":
+            symspell_index = FuzzySearchService.get_symspell_index(corpus_index)
+            if symspell_index.overflow:
+                raise ValueError("Индекс SymSpell для этого корпуса превышает лимит памяти")
+            candidates = [corpus_index.words[i] for i in symspell_index.candidates(query_word, max_distance)]
+            if stats is not None:
+                stats["total"] = len(corpus_index)
+                stats["symspell_filter"] = len(corpus_index) - len(candidates)
+                stats["verified"] = len(candidates)
+            return candidates
+        raise ValueError(f"Движок {engine} не перебирает кандидатов")
+
+    @staticmethod
+    def _iter_scan(
+        words: List[str],
+        matcher: Callable[[str, int], int],
+        max_distance: int
+    ) -> Iterator[Tuple[str, int]]:
+        for word in words:
+            distance = matcher(word, max_distance)
+            if distance <= max_distance:
+                yield word, distance
+
+    @staticmethod
+    def _scan(
+        words: List[str],
+        matcher: Callable[[str, int], int],
+        max_distance: int,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        top_k: Optional[int] = None
+    ) -> List[Tuple[str, int]]:
+        """Полный перебор словаря.
+
+        При заданном top_k лучшие кандидаты хранятся в ограниченной куче, а порог,
+        передаваемый в функцию расстояния, сужается до худшего расстояния в куче.
+        """
+        matches = []
+        # Элементы кучи: (-расстояние, -номер, слово) - в вершине худший и самый поздний
+        heap = []
+        cutoff = max_distance
+        total = len(words)
+        
+        for i, word in enumerate(words):
+            distance = matcher(word, cutoff)
+            
+            if distance <= cutoff:
+                if top_k is None:
+                    matches.append((word, distance))
+                else:
+                    if len(heap) < top_k:
+                        heapq.heappush(heap, (-distance, -i, word))
+                    else:
+                        heapq.heapreplace(heap, (-distance, -i, word))
+                    if len(heap) == top_k:
+                        # Дальше интересны только слова строго ближе худшего в куче
+                        cutoff = -heap[0][0] - 1
+            
+            if progress_callback is not None:
+                progress_callback(i + 1, total)
+            
+            if cutoff < 0:
+                # В куче top_k точных совпадений - лучше уже не найти
+                if progress_callback is not None and i + 1 < total:
+                    progress_callback(total, total)
+                break
+        
+        if top_k is not None:
+            matches = [(word, -distance) for distance, _, word in sorted(heap, key=lambda item: (-item[0], -item[1]))]
+        return matches
+
     @staticmethod
     def get_available_algorithms() -> List[str]:
         """Возвращает список доступных алгоритмов"""
-        return ["levenshtein", "damerau_levenshtein"] 
\ No newline at end of file
+        return ["levenshtein", "damerau_levenshtein", *FuzzySearchService.BIT_PARALLEL_ALGORITHMS]
+
+    @staticmethod
+    def get_available_engines() -> List[str]:
+        """Возвращает список доступных движков поиска"""
+        return ["brute_force", "bk_tree", "numpy_batch", "qgram", "symspell", "parallel"]
\ No newline at end of file
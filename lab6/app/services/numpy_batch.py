@@ -0,0 +1,113 @@
+from typing import List, Optional, Tuple
+import numpy as np
+
+
+class NumpyBatchIndex:
+    """Векторизованный расчет расстояний сразу для всего словаря.
+
+    Слова группируются по длине в матрицы кодов символов, и динамика
+    продвигается по одному символу запроса одновременно для всех кандидатов
+    группы. Поддерживаются Левенштейн и ограниченный Дамерау-Левенштейн (OSA).
+    """
+
+    def __init__(self, words: List[str]):
+        groups = {}
+        for position, word in enumerate(words):
+            groups.setdefault(len(word), []).append(position)
+
+        self.words = words
+        # (длина, позиции слов группы в self.words, матрица кодов символов n x длина)
+        self.groups: List[Tuple[int, np.ndarray, np.ndarray]] = []
+        for length in sorted(groups):
+            positions = np.array(groups[length], dtype=np.int64)
+            codes = np.array(
+                [[ord(c) for c in words[i]] for i in positions], dtype=np.int32
+            ).reshape(len(positions), length)
+            self.groups.append((length, positions, codes))
+
+    def distances(
+        self,
+        query: str,
+        transpositions: bool = False,
+        max_distance: Optional[int] = None
+    ) -> np.ndarray:
+        """Возвращает массив расстояний в порядке исходного словаря (self.words).
+
+        При заданном пороге значения больше порога заменяются на max_distance + 1.
+        """
+        over = len(query) + max(map(len, self.words), default=0) + 1
+        if max_distance is not None:
+            over = max_distance + 1
+        result = np.full(len(self.words), over, dtype=np.int32)
+
+        query_codes = np.array([ord(c) for c in query], dtype=np.int32)
+        for length, positions, codes in self.groups:
+            # Разница длин - нижняя граница, такие группы пропускаем целиком
+            if max_distance is not None and abs(length - len(query)) > max_distance:
+                continue
+            group_result = self._group_distances(query_codes, codes, transpositions, max_distance)
+            result[positions] = np.minimum(group_result, over)
+        return result
+
+    def search(
+        self,
+        query: str,
+        max_distance: int,
+        transpositions: bool = False
+    ) -> List[Tuple[str, int]]:
+        """Возвращает пары (слово, расстояние) с расстоянием не больше max_distance"""
+        distances = self.distances(query, transpositions, max_distance)
+        return [
+            (self.words[i], int(distances[i]))
+            for i in np.flatnonzero(distances <= max_distance)
+        ]
+
+    @staticmethod
+    def _group_distances(
+        query_codes: np.ndarray,
+        codes: np.ndarray,
+        transpositions: bool,
+        max_distance: Optional[int]
+    ) -> np.ndarray:
+        count, length = codes.shape
+        columns = np.arange(length + 1, dtype=np.int32)
+        result = np.full(count, np.iinfo(np.int32).max, dtype=np.int32)
+
+        # Кандидаты, которые еще могут уложиться в порог
+        alive = np.arange(count)
+        previous_row = np.tile(columns, (count, 1))
+        two_ago = None
+        for i, query_code in enumerate(query_codes, start=1):
+            matches = codes == query_code
+
+            # Замена и удаление зависят только от предыдущей строки
+            candidates = np.empty_like(previous_row)
+            candidates[:, 0] = i
+            candidates[:, 1:] = np.minimum(
+                previous_row[:, :-1] + ~matches,
+                previous_row[:, 1:] + 1
+            )
+            if transpositions and two_ago is not None and length >= 2:
+                swapped = (codes[:, :-1] == query_code) & (codes[:, 1:] == query_codes[i - 2])
+                candidates[:, 2:] = np.where(
+                    swapped,
+                    np.minimum(candidates[:, 2:], two_ago[:, :-2] + 1),
+                    candidates[:, 2:]
+                )
+
+            # Вставка: cur[j] = min(cand[j], cur[j - 1] + 1) через префиксный минимум
+            current_row = np.minimum.accumulate(candidates - columns, axis=1) + columns
+
+            if max_distance is not None:
+                keep = current_row.min(axis=1) <= max_distance
+                if not keep.all():
+                    alive = alive[keep]
+                    codes = codes[keep]
+                    current_row = current_row[keep]
+                    previous_row = previous_row[keep]
+                    if not len(alive):
+                        return result
+            two_ago, previous_row = previous_row, current_row
+
+        result[alive] = previous_row[:, length]
+        return result
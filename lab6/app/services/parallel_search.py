@@ -0,0 +1,176 @@
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+
+# Шарды словарей, загруженные в текущий процесс-воркер: (корпус, версия) -> индекс
+_worker_shards: "OrderedDict[Tuple[int, str], object]" = OrderedDict()
+
+
+def _load_shard(corpus_id: int, version: str, shard: int, shard_count: int):
+    """Загружает из БД только свой шард словаря корпуса.
+
+    Словарь к этому моменту уже есть в БД: вызывающий процесс получил индекс
+    корпуса через get_corpus_index, который при необходимости строит словарь.
+    """
+    from app.db.database import SessionLocal
+    from app.cruds.corpus import get_corpus_vocabulary_shard
+    from app.services.corpus_index import CorpusIndex
+
+    db = SessionLocal()
+    try:
+        frequencies = get_corpus_vocabulary_shard(db, corpus_id, shard, shard_count)
+    finally:
+        db.close()
+
+    return CorpusIndex(corpus_id, frequencies, version)
+
+
+def _search_shard(
+    corpus_id: int,
+    version: str,
+    shard: int,
+    shard_count: int,
+    query_word: str,
+    algorithm: str,
+    max_distance: int,
+    top_k: Optional[int]
+) -> Tuple[List[Tuple[str, int]], Dict[str, int]]:
+    """Выполняется в воркере: перебор своего шарда словаря"""
+    key = (corpus_id, version)
+    shard_index = _worker_shards.get(key)
+    if shard_index is None:
+        shard_index = _load_shard(corpus_id, version, shard, shard_count)
+        _worker_shards[key] = shard_index
+        while len(_worker_shards) > settings.corpus_index_cache_size:
+            _worker_shards.popitem(last=False)
+    _worker_shards.move_to_end(key)
+    return _scan_shard(shard_index, query_word, algorithm, max_distance, top_k)
+
+
+def _scan_shard(
+    shard_index,
+    query_word: str,
+    algorithm: str,
+    max_distance: int,
+    top_k: Optional[int]
+) -> Tuple[List[Tuple[str, int]], Dict[str, int]]:
+    from app.services.fuzzy_search import FuzzySearchService
+
+    stats = {}
+    results, _ = FuzzySearchService.search_with_algorithm(
+        query_word,
+        shard_index,
+        algorithm,
+        max_distance=max_distance,
+        engine="brute_force",
+        stats=stats,
+        top_k=top_k
+    )
+    return [(result.word, result.distance) for result in results], stats
+
+
+class ShardedSearchPool:
+    """Постоянный пул процессов для поиска по большим словарям.
+
+    Каждый шард закреплен за своим однопроцессным пулом, поэтому воркер один
+    раз загружает из БД свою часть словаря и держит ее в памяти; в запросе
+    передаются только id корпуса и параметры поиска.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executors: List[ProcessPoolExecutor] = []
+        self._lock = threading.Lock()
+        self.restarts = 0
+        self.fallbacks = 0
+
+    @staticmethod
+    def _create_executor() -> ProcessPoolExecutor:
+        # spawn: воркеры не наследуют соединения с БД и потоки родителя
+        return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+    def _get_executors(self) -> List[ProcessPoolExecutor]:
+        with self._lock:
+            if not self._executors:
+                self._executors = [self._create_executor() for _ in range(self.workers)]
+            return list(self._executors)
+
+    def _replace_executor(self, shard: int, executor: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """Заменяет сломанный пул шарда; новый воркер загрузит шард при первом запросе"""
+        with self._lock:
+            if shard >= len(self._executors):
+                raise BrokenProcessPool("Пул шардов остановлен")
+            # Пул мог уже заменить параллельный запрос
+            if self._executors[shard] is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executors[shard] = self._create_executor()
+                self.restarts += 1
+            return self._executors[shard]
+
+    @staticmethod
+    def _submit(executor: ProcessPoolExecutor, *args) -> Future:
+        try:
+            return executor.submit(_search_shard, *args)
+        except BrokenProcessPool as error:
+            future = Future()
+            future.set_exception(error)
+            return future
+
+    def _search_shard_with_retry(self, shard: int, executor: ProcessPoolExecutor, future: Future, args: tuple):
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            pass
+        # Процесс шарда погиб (OOM, сбой) - повторяем на новом процессе
+        try:
+            return self._submit(self._replace_executor(shard, executor), *args).result()
+        except BrokenProcessPool:
+            pass
+        # Повторно не вышло - перебираем шард в текущем процессе
+        corpus_id, version, shard, shard_count, query_word, algorithm, max_distance, top_k = args
+        self.fallbacks += 1
+        return _scan_shard(
+            _load_shard(corpus_id, version, shard, shard_count), query_word, algorithm, max_distance, top_k
+        )
+
+    def search(
+        self,
+        corpus_id: int,
+        version: str,
+        query_word: str,
+        algorithm: str,
+        max_distance: int,
+        top_k: Optional[int] = None,
+        stats: Optional[Dict[str, int]] = None
+    ) -> List[Tuple[str, int]]:
+        executors = self._get_executors()
+        shard_args = [
+            (corpus_id, version, shard, len(executors), query_word, algorithm, max_distance, top_k)
+            for shard in range(len(executors))
+        ]
+        futures = [self._submit(executor, *args) for executor, args in zip(executors, shard_args)]
+
+        # Объединяем частичные результаты шардов
+        matches = []
+        for shard, (executor, future) in enumerate(zip(executors, futures)):
+            shard_matches, shard_stats = self._search_shard_with_retry(
+                shard, executor, future, shard_args[shard]
+            )
+            matches.extend(shard_matches)
+            if stats is not None:
+                for name, value in shard_stats.items():
+                    stats[name] = stats.get(name, 0) + value
+        return matches
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for executor in self._executors:
+                executor.shutdown(wait=False, cancel_futures=True)
+            self._executors = []
+
+
+sharded_search_pool = ShardedSearchPool(settings.parallel_workers)
@@ -0,0 +1,127 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+from passlib.context import CryptContext
+from app.core.config import settings
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+
+class PasswordHasherBusy(Exception):
+    """Очередь хэширования заполнена - запрос нужно повторить позже"""
+
+
+def _hash_password(password: str) -> Tuple[str, float]:
+    started_at = time.time()
+    return pwd_context.hash(password), started_at
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, float]:
+    started_at = time.time()
+    return pwd_context.verify(plain_password, hashed_password), started_at
+
+
+class PasswordHasher:
+    """Хэширование bcrypt в отдельном пуле процессов с ограниченной очередью.
+
+    bcrypt намеренно медленный: в общем пуле потоков всплеск логинов занимал
+    бы потоки, нужные поиску. Здесь число процессов задает параллельность,
+    а max_queue - сколько запросов может ждать; сверх этого запросы
+    отклоняются с PasswordHasherBusy.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.max_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.total_queue_wait = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: процесс сервера многопоточный, fork в нем небезопасен
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            # Пул мог уже пересоздать параллельный запрос
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self.restarts += 1
+
+    async def _run(self, func: Callable[..., Tuple[Any, float]], *args) -> Any:
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        submitted_at = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            # Если процесс пула погиб (OOM, сбой), пул сломан навсегда: пересоздаем
+            # его и повторяем запрос один раз
+            for attempt in range(2):
+                executor = self._get_executor()
+                try:
+                    result, started_at = await loop.run_in_executor(executor, func, *args)
+                    break
+                except BrokenProcessPool:
+                    self._discard_executor(executor)
+                    if attempt:
+                        raise PasswordHasherBusy()
+        finally:
+            self.pending -= 1
+        latency = time.time() - submitted_at
+        self.completed += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.total_queue_wait += max(0.0, started_at - submitted_at)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify_password, plain_password, hashed_password)
+
+    def get_stats(self) -> dict:
+        completed = self.completed or 1
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queue_depth": max(0, self.pending - self.workers),
+            "in_flight": self.pending,
+            "max_in_flight": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "avg_latency_ms": self.total_latency / completed * 1000,
+            "max_latency_ms": self.max_latency * 1000,
+            "avg_queue_wait_ms": self.total_queue_wait / completed * 1000,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_max_queue)
@@ -0,0 +1,84 @@
+from typing import Dict, List, Optional
+import numpy as np
+
+
+class CandidateFilter:
+    """Отсев кандидатов по нижним границам расстояния до запуска динамики.
+
+    Для каждого слова при построении индекса запоминаются длина и гистограмма
+    символов по BUCKETS корзинам (код символа по модулю BUCKETS: латиница и
+    кириллица раскладываются по корзинам без коллизий). Обе границы верны для
+    Левенштейна и обоих вариантов Дамерау-Левенштейна: транспозиция не меняет
+    ни длину, ни набор символов.
+    """
+
+    BUCKETS = 32
+    CHUNK_SIZE = 65536
+
+    def __init__(self, words: List[str]):
+        self.words = words
+        self.lengths = np.fromiter(map(len, words), dtype=np.int32, count=len(words))
+        self.histograms = self.build_histograms(words, self.lengths)
+
+    @classmethod
+    def build_histograms(cls, words: List[str], lengths: np.ndarray) -> np.ndarray:
+        histograms = np.zeros((len(words), cls.BUCKETS), dtype=np.uint8)
+        # Гистограммы считаем блоками, чтобы не раздувать временные массивы
+        for start in range(0, len(words), cls.CHUNK_SIZE):
+            chunk = words[start:start + cls.CHUNK_SIZE]
+            chunk_lengths = lengths[start:start + len(chunk)]
+            codes = np.fromiter(
+                (ord(c) % cls.BUCKETS for word in chunk for c in word),
+                dtype=np.int64,
+                count=int(chunk_lengths.sum())
+            )
+            rows = np.repeat(np.arange(len(chunk)), chunk_lengths)
+            counts = np.bincount(rows * cls.BUCKETS + codes, minlength=len(chunk) * cls.BUCKETS)
+            # Насыщение на 255 только ослабляет границу, но не ломает ее
+            histograms[start:start + len(chunk)] = np.minimum(counts, 255).reshape(-1, cls.BUCKETS)
+        return histograms
+
+    def histogram(self, word: str) -> np.ndarray:
+        counts = np.zeros(self.BUCKETS, dtype=np.int16)
+        for c in word:
+            counts[ord(c) % self.BUCKETS] += 1
+        return np.minimum(counts, 255)
+
+    def filter(self, query: str, max_distance: int, stats: Optional[Dict[str, int]] = None) -> List[str]:
+        """Возвращает слова, которые могут оказаться не дальше max_distance от запроса"""
+        candidates = np.flatnonzero(np.abs(self.lengths - len(query)) <= max_distance)
+        after_length = len(candidates)
+
+        # Расстояние по мультимножествам символов (bag distance)
+        difference = self.histograms[candidates].astype(np.int16) - self.histogram(query)
+        surplus = np.clip(difference, 0, None).sum(axis=1)
+        deficit = np.clip(-difference, 0, None).sum(axis=1)
+        candidates = candidates[np.maximum(surplus, deficit) <= max_distance]
+
+        if stats is not None:
+            stats["total"] = len(self.words)
+            stats["length_filter"] = len(self.words) - after_length
+            stats["histogram_filter"] = after_length - len(candidates)
+            stats["verified"] = len(candidates)
+        return [self.words[i] for i in candidates]
+
+    def filter_many(self, queries: List[str], max_distance: int) -> List[List[str]]:
+        """Отбирает кандидатов для пакета запросов.
+
+        Гистограммы всех запросов считаются одним проходом, а запросы одной
+        длины делят маску по длине и выборку гистограмм словаря.
+        """
+        lengths = np.fromiter(map(len, queries), dtype=np.int32, count=len(queries))
+        histograms = self.build_histograms(queries, lengths).astype(np.int16)
+        result: List[List[str]] = [[] for _ in queries]
+        for length in np.unique(lengths):
+            candidates = np.flatnonzero(np.abs(self.lengths - length) <= max_distance)
+            candidate_histograms = self.histograms[candidates].astype(np.int16)
+            for position in np.flatnonzero(lengths == length):
+                difference = candidate_histograms - histograms[position]
+                surplus = np.clip(difference, 0, None).sum(axis=1)
+                deficit = np.clip(-difference, 0, None).sum(axis=1)
+                result[position] = [
+                    self.words[i] for i in candidates[np.maximum(surplus, deficit) <= max_distance]
+                ]
+        return result
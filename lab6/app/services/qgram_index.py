@@ -0,0 +1,60 @@
+from typing import Dict, Iterable, List, Optional, Set
+import numpy as np
+
+
+class QGramIndex:
+    """Инвертированный индекс q-грамм словаря корпуса.
+
+    Для каждой q-граммы хранится массив позиций слов словаря, в которых она
+    встречается. Кандидаты отбираются по лемме о числе общих q-грамм: одна
+    правка уничтожает не более q различных q-грамм запроса (q + 1 для
+    транспозиции), поэтому у слова на расстоянии не больше k должно быть
+    хотя бы |Q(запрос)| - k * (q или q + 1) общих q-грамм.
+    """
+
+    PADDING = "#"
+
+    def __init__(self, q: int, word_count: int, postings: Dict[str, np.ndarray]):
+        self.q = q
+        self.word_count = word_count
+        self.postings = postings
+
+    @classmethod
+    def build(cls, words: List[str], q: int = 2) -> "QGramIndex":
+        positions: Dict[str, List[int]] = {}
+        for position, word in enumerate(words):
+            for gram in cls.grams(word, q):
+                positions.setdefault(gram, []).append(position)
+        postings = {
+            gram: np.array(items, dtype=np.int32)
+            for gram, items in positions.items()
+        }
+        return cls(q, len(words), postings)
+
+    @classmethod
+    def grams(cls, word: str, q: int) -> Set[str]:
+        """Множество q-грамм слова, дополненного с обеих сторон"""
+        padding = cls.PADDING * (q - 1)
+        padded = f"{padding}{word}{padding}"
+        return {padded[i:i + q] for i in range(len(padded) - q + 1)}
+
+    def candidates(self, query: str, max_distance: int, transpositions: bool = False) -> Optional[np.ndarray]:
+        """Возвращает позиции слов-кандидатов или None, если лемма ничего не
+        отсекает и нужно проверять весь словарь"""
+        query_grams = self.grams(query, self.q)
+        damage = self.q + 1 if transpositions else self.q
+        threshold = len(query_grams) - max_distance * damage
+        if threshold <= 0:
+            return None
+
+        lists = [self.postings[gram] for gram in query_grams if gram in self.postings]
+        if not lists:
+            return np.empty(0, dtype=np.int32)
+        counts = np.bincount(np.concatenate(lists), minlength=self.word_count)
+        return np.flatnonzero(counts >= threshold)
+
+    def items(self) -> Iterable:
+        return self.postings.items()
+
+    def __len__(self) -> int:
+        return len(self.postings)
@@ -0,0 +1,256 @@
+import io
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from typing import BinaryIO, List, Optional, Sequence, Tuple
+import numpy as np
+from app.core.config import settings
+
+# Строка результата: (исходный запрос пакета или None, найденное слово, расстояние)
+ResultRow = Tuple[Optional[str], str, int]
+
+MAGIC = b"FSR2"
+FLAG_COMPRESSED = 1
+FLAG_HAS_QUERIES = 2
+# magic, флаги, id владельца, число строк, строк в блоке
+HEADER = struct.Struct("<4sBqII")
+# Таблица блоков после заголовка: смещение блока в файле и его размер
+BLOCK_ENTRY = struct.Struct("<QI")
+# Начало блока (после распаковки): длина слов и длина запросов в байтах
+BLOCK_HEADER = struct.Struct("<II")
+# Как часто удалять устаревшие результаты при записи новых, секунды
+PURGE_INTERVAL = 600
+
+
+def _pack_strings(values: Sequence[str]) -> Tuple[np.ndarray, bytes]:
+    encoded = [value.encode("utf-8") for value in values]
+    lengths = np.fromiter((len(value) for value in encoded), dtype=np.uint32, count=len(encoded))
+    return lengths, b"".join(encoded)
+
+
+def _unpack_strings(lengths: np.ndarray, data: bytes, start: int, stop: int) -> List[str]:
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return [
+        data[offsets[i]:offsets[i + 1]].decode("utf-8")
+        for i in range(start, stop)
+    ]
+
+
+def _encode_block(rows: Sequence[ResultRow], has_queries: bool) -> bytes:
+    distances = np.fromiter((distance for _, _, distance in rows), dtype=np.int32, count=len(rows))
+    word_lengths, words = _pack_strings([word for _, word, _ in rows])
+    if has_queries:
+        query_lengths, queries = _pack_strings([query or "" for query, _, _ in rows])
+    else:
+        query_lengths, queries = np.empty(0, dtype=np.uint32), b""
+    return b"".join((
+        BLOCK_HEADER.pack(len(words), len(queries)),
+        distances.tobytes(), word_lengths.tobytes(), query_lengths.tobytes(), words, queries
+    ))
+
+
+def _decode_block(block: bytes, row_count: int, has_queries: bool, start: int, stop: int) -> List[ResultRow]:
+    words_size, queries_size = BLOCK_HEADER.unpack_from(block)
+    query_count = row_count if has_queries else 0
+    position = BLOCK_HEADER.size
+    distances = np.frombuffer(block, dtype=np.int32, count=row_count, offset=position)
+    position += row_count * 4
+    word_lengths = np.frombuffer(block, dtype=np.uint32, count=row_count, offset=position)
+    position += row_count * 4
+    query_lengths = np.frombuffer(block, dtype=np.uint32, count=query_count, offset=position)
+    position += query_count * 4
+    words = block[position:position + words_size]
+    queries = block[position + words_size:position + words_size + queries_size]
+
+    page_words = _unpack_strings(word_lengths, words, start, stop)
+    if has_queries:
+        page_queries: List[Optional[str]] = _unpack_strings(query_lengths, queries, start, stop)
+    else:
+        page_queries = [None] * (stop - start)
+    return [
+        (query, word, int(distance))
+        for query, word, distance in zip(page_queries, page_words, distances[start:stop])
+    ]
+
+
+def encode_results(
+    user_id: int, rows: Sequence[ResultRow], compression_level: int = 0, block_rows: int = 1000
+) -> bytes:
+    """Кодирует результаты по столбцам блоками по block_rows строк.
+
+    В блоке расстояния и длины строк - массивы int32/uint32, сами строки -
+    одним куском UTF-8; каждый блок при желании сжимается zlib отдельно.
+    Таблица смещений блоков в начале файла позволяет читать страницу, не
+    распаковывая остальные блоки.
+    """
+    has_queries = any(query is not None for query, _, _ in rows)
+    flags = FLAG_HAS_QUERIES if has_queries else 0
+    if compression_level > 0:
+        flags |= FLAG_COMPRESSED
+    blocks = []
+    for block_start in range(0, len(rows), block_rows):
+        block = _encode_block(rows[block_start:block_start + block_rows], has_queries)
+        if compression_level > 0:
+            block = zlib.compress(block, compression_level)
+        blocks.append(block)
+
+    position = HEADER.size + BLOCK_ENTRY.size * len(blocks)
+    table = []
+    for block in blocks:
+        table.append(BLOCK_ENTRY.pack(position, len(block)))
+        position += len(block)
+    return b"".join([HEADER.pack(MAGIC, flags, user_id, len(rows), block_rows), *table, *blocks])
+
+
+def read_header(file: BinaryIO) -> Tuple[int, int, int, int]:
+    """Возвращает (флаги, id владельца, число строк, строк в блоке)"""
+    data = file.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError("Неизвестный формат результатов")
+    magic, flags, user_id, count, block_rows = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("Неизвестный формат результатов")
+    return flags, user_id, count, block_rows
+
+
+def read_results(
+    file: BinaryIO,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    header: Optional[Tuple[int, int, int, int]] = None
+) -> Tuple[int, List[ResultRow]]:
+    """Возвращает (число строк, строки с offset по offset + limit), читая только нужные блоки"""
+    if header is None:
+        file.seek(0)
+        header = read_header(file)
+    flags, _, count, block_rows = header
+    start = min(offset, count)
+    stop = count if limit is None else min(count, start + limit)
+    rows: List[ResultRow] = []
+    if start >= stop:
+        return count, rows
+
+    first_block, last_block = start // block_rows, (stop - 1) // block_rows
+    file.seek(HEADER.size + BLOCK_ENTRY.size * first_block)
+    entries = [
+        BLOCK_ENTRY.unpack(file.read(BLOCK_ENTRY.size))
+        for _ in range(first_block, last_block + 1)
+    ]
+    for block_number, (block_offset, block_size) in enumerate(entries, first_block):
+        file.seek(block_offset)
+        block = file.read(block_size)
+        if flags & FLAG_COMPRESSED:
+            block = zlib.decompress(block)
+        block_start = block_number * block_rows
+        rows.extend(_decode_block(
+            block,
+            min(block_rows, count - block_start),
+            bool(flags & FLAG_HAS_QUERIES),
+            max(start, block_start) - block_start,
+            min(stop, block_start + block_rows) - block_start
+        ))
+    return count, rows
+
+
+def decode_results(data: bytes, offset: int = 0, limit: Optional[int] = None) -> Tuple[int, List[ResultRow]]:
+    """Возвращает (число строк, строки с offset по offset + limit) из закодированных байтов"""
+    return read_results(io.BytesIO(data), offset, limit)
+
+
+class ResultStore:
+    """Файловое хранилище результатов фоновых задач.
+
+    Воркер записывает результаты задачи в компактном столбцовом виде, а через
+    брокер и WebSocket передается только ссылка (id задачи) и число строк.
+    API читает результаты постранично. Каталог должен быть общим для воркеров
+    и API, как и хранилище корпусов. Файлы старше ttl удаляются.
+    """
+
+    def __init__(self, root: str, compression_level: int, block_rows: int, ttl: int):
+        self.root = root
+        self.temp_dir = os.path.join(root, "tmp")
+        self.compression_level = compression_level
+        self.block_rows = block_rows
+        self.ttl = ttl
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_valid_ref(result_ref: str) -> bool:
+        # Ссылка - id задачи Celery (UUID); прочее не должно превращаться в путь
+        return 0 < len(result_ref) <= 64 and all(c in "0123456789abcdefABCDEF-" for c in result_ref)
+
+    def path(self, result_ref: str) -> str:
+        return os.path.join(self.root, result_ref[:2], result_ref + ".bin")
+
+    def put(self, result_ref: str, user_id: int, rows: Sequence[ResultRow]) -> int:
+        """Сохраняет результаты и возвращает размер записи в байтах"""
+        if not self.is_valid_ref(result_ref):
+            raise ValueError(f"Некорректная ссылка на результат: {result_ref}")
+        data = encode_results(user_id, rows, self.compression_level, self.block_rows)
+        path = self.path(result_ref)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.makedirs(self.temp_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.temp_dir)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            # Читатели не увидят недописанный файл
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._maybe_purge()
+        return len(data)
+
+    def get_page(
+        self, result_ref: str, user_id: int, offset: int, limit: int
+    ) -> Optional[Tuple[int, List[ResultRow]]]:
+        """Страница результатов или None, если их нет или они принадлежат другому пользователю"""
+        if not self.is_valid_ref(result_ref):
+            return None
+        try:
+            file = open(self.path(result_ref), "rb")
+        except FileNotFoundError:
+            return None
+        with file:
+            # Читаем заголовок, таблицу блоков и только блоки, попавшие в страницу
+            header = read_header(file)
+            if header[1] != user_id:
+                return None
+            return read_results(file, offset, limit, header)
+
+    def _maybe_purge(self) -> None:
+        now = time.time()
+        with self._lock:
+            if now - self._last_purge < PURGE_INTERVAL:
+                return
+            self._last_purge = now
+        self.purge_expired(now)
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        deadline = (now or time.time()) - self.ttl
+        removed = 0
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getmtime(path) < deadline:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+result_store = ResultStore(
+    settings.result_storage_dir,
+    settings.result_compression_level,
+    settings.result_block_rows,
+    settings.result_ttl
+)
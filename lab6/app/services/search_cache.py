@@ -0,0 +1,204 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.fuzzy_search import FuzzySearchService
+
+
+class InMemoryCacheBackend:
+    """LRU-кэш с TTL в памяти процесса"""
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def get_version(self, corpus_id: int) -> int:
+        with self._lock:
+            return self._versions.get(corpus_id, 0)
+
+    def bump_version(self, corpus_id: int) -> None:
+        with self._lock:
+            self._versions[corpus_id] = self._versions.get(corpus_id, 0) + 1
+            # Записи старой версии больше не нужны
+            prefix = f"search:{corpus_id}:"
+            for key in [key for key in self._items if key.startswith(prefix)]:
+                del self._items[key]
+
+    def get_evictions(self) -> int:
+        return self.evictions
+
+
+class RedisCacheBackend:
+    """Кэш в Redis: TTL на записях, вытеснение настраивается политикой maxmemory Redis"""
+
+    def __init__(self, redis_url: str, ttl: int):
+        import redis
+
+        self.ttl = ttl
+        self.client = redis.Redis.from_url(redis_url)
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(key)
+        return value.decode() if value is not None else None
+
+    def set(self, key: str, value: str) -> None:
+        self.client.setex(key, self.ttl, value)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def get_version(self, corpus_id: int) -> int:
+        value = self.client.get(f"search_version:{corpus_id}")
+        return int(value) if value is not None else 0
+
+    def bump_version(self, corpus_id: int) -> None:
+        # Старые записи недостижимы по новым ключам и истекут по TTL
+        self.client.incr(f"search_version:{corpus_id}")
+
+    def get_evictions(self) -> int:
+        return int(self.client.info("stats").get("evicted_keys", 0))
+
+
+class SearchResultCache:
+    """Кэш результатов поиска по (корпус, версия корпуса, запрос, алгоритм, движок, порог, top_k).
+
+    Движок входит в ключ: результаты движков совпадают, но время и статистика
+    фильтров у каждого свои, и их сравнение не должно подменяться ответом из кэша.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _make_key(
+        self, corpus_id: int, word: str, algorithm: str, engine: str, max_distance: int, top_k: Optional[int]
+    ) -> str:
+        version = self.backend.get_version(corpus_id)
+        query = FuzzySearchService.normalize_query(word)
+        return f"search:{corpus_id}:{version}:{algorithm}:{engine}:{max_distance}:{top_k or 'all'}:{query}"
+
+    def get(
+        self,
+        corpus_id: int,
+        word: str,
+        algorithm: str,
+        engine: str,
+        max_distance: int,
+        top_k: Optional[int] = None
+    ) -> Optional[List[dict]]:
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(self._make_key(corpus_id, word, algorithm, engine, max_distance, top_k))
+        except Exception:
+            # Недоступный кэш не должен ломать поиск
+            self.errors += 1
+            return None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def get_many(
+        self,
+        corpus_id: int,
+        words: List[str],
+        algorithm: str,
+        engine: str,
+        max_distance: int,
+        top_k: Optional[int] = None
+    ) -> Dict[str, List[dict]]:
+        """Возвращает закэшированные результаты для пакета слов; промахи в словарь не попадают"""
+        hits = {}
+        for word in dict.fromkeys(words):
+            value = self.get(corpus_id, word, algorithm, engine, max_distance, top_k)
+            if value is not None:
+                hits[word] = value
+        return hits
+
+    def set(
+        self,
+        corpus_id: int,
+        word: str,
+        algorithm: str,
+        engine: str,
+        max_distance: int,
+        results: List[dict],
+        top_k: Optional[int] = None
+    ) -> None:
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(
+                self._make_key(corpus_id, word, algorithm, engine, max_distance, top_k),
+                json.dumps(results)
+            )
+        except Exception:
+            self.errors += 1
+
+    def invalidate_corpus(self, corpus_id: int) -> None:
+        if self.backend is None:
+            return
+        try:
+            self.backend.bump_version(corpus_id)
+        except Exception:
+            self.errors += 1
+
+    def get_stats(self) -> dict:
+        evictions = 0
+        if self.backend is not None:
+            try:
+                evictions = self.backend.get_evictions()
+            except Exception:
+                self.errors += 1
+        return {
+            "backend": settings.search_cache_backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": evictions,
+            "errors": self.errors,
+        }
+
+
+def create_cache_backend():
+    if settings.search_cache_backend == "redis":
+        return RedisCacheBackend(settings.redis_url, settings.search_cache_ttl)
+    if settings.search_cache_backend == "memory":
+        return InMemoryCacheBackend(settings.search_cache_size, settings.search_cache_ttl)
+    return None
+
+
+search_cache = SearchResultCache(create_cache_backend())
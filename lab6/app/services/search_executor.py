@@ -0,0 +1,33 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+from app.core.config import settings
+from app.db.database import SessionLocal
+
+# Поиск нагружает процессор - держим его в своем ограниченном пуле потоков,
+# чтобы он не занимал общий пул FastAPI и не блокировал цикл событий
+search_executor = ThreadPoolExecutor(max_workers=settings.search_threads, thread_name_prefix="search")
+
+
+async def run_search(func: Callable[..., Any], *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(search_executor, partial(func, *args, **kwargs))
+
+
+def _call_with_session(func: Callable[..., Any], *args, **kwargs) -> Any:
+    db = SessionLocal()
+    try:
+        return func(db, *args, **kwargs)
+    finally:
+        db.close()
+
+
+async def run_with_session(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Выполняет синхронную функцию CRUD с собственной сессией в пуле поиска.
+
+    AsyncSession.run_sync выполняет функцию в потоке цикла событий, поэтому
+    тяжелые операции со словарем корпуса (построение, индекс q-грамм, вставка
+    словаря) идут через обычную сессию в отдельном потоке.
+    """
+    return await run_search(_call_with_session, func, *args, **kwargs)
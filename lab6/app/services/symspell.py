@@ -0,0 +1,62 @@
+from typing import Dict, List, Set
+
+
+class SymSpellIndex:
+    """Индекс симметричных удалений (SymSpell) для поиска с малым расстоянием.
+
+    Каждое слово словаря раскладывается на все строки, получаемые удалением
+    не более max_depth символов. Если расстояние между словами не больше k
+    (включая транспозиции), у них есть общая строка, полученная не более чем
+    k удалениями с каждой стороны, поэтому поиск сводится к обращениям
+    к хеш-таблице и проверке найденных кандидатов.
+    """
+
+    def __init__(self, max_depth: int, max_entries: int):
+        self.max_depth = max_depth
+        self.max_entries = max_entries
+        self.deletes: Dict[str, List[int]] = {}
+        self.entries = 0
+        # Индекс не поместился в лимит и не может использоваться
+        self.overflow = False
+
+    @classmethod
+    def build(cls, words: List[str], max_depth: int, max_entries: int) -> "SymSpellIndex":
+        index = cls(max_depth, max_entries)
+        for position, word in enumerate(words):
+            for variant in cls.generate_deletes(word, max_depth):
+                index.deletes.setdefault(variant, []).append(position)
+                index.entries += 1
+            if index.entries > max_entries:
+                # Освобождаем память сразу, частично построенный индекс бесполезен
+                index.deletes = {}
+                index.overflow = True
+                break
+        return index
+
+    @staticmethod
+    def generate_deletes(word: str, depth: int) -> Set[str]:
+        """Все строки, получаемые из слова удалением не более depth символов (включая само слово)"""
+        result = {word}
+        level = {word}
+        for _ in range(depth):
+            next_level = set()
+            for variant in level:
+                for i in range(len(variant)):
+                    next_level.add(variant[:i] + variant[i + 1:])
+            next_level -= result
+            if not next_level:
+                break
+            result |= next_level
+            level = next_level
+        return result
+
+    def candidates(self, query: str, max_distance: int) -> Set[int]:
+        """Возвращает позиции слов, которые могут быть не дальше max_distance от запроса"""
+        if max_distance > self.max_depth:
+            raise ValueError(
+                f"Индекс SymSpell построен для расстояния не больше {self.max_depth}"
+            )
+        positions = set()
+        for variant in self.generate_deletes(query, max_distance):
+            positions.update(self.deletes.get(variant, ()))
+        return positions
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import event
+from app.core.config import settings
+from app.models.user import User
+from app.services.search_cache import InMemoryCacheBackend, RedisCacheBackend
+
+# Поля пользователя, которые нужны обработчикам; хэш пароля в кэш не попадает
+USER_FIELDS = ("id", "email", "created_at", "updated_at")
+
+
+class UserCache:
+    """Кэш аутентификации: расшифрованные токены и данные пользователей по id.
+
+    Токены хранятся только в памяти процесса и живут не дольше своего exp.
+    Пользователи хранятся в бэкенде (память или Redis) с коротким TTL и
+    сбрасываются через invalidate_user при изменении.
+    """
+
+    def __init__(self, backend, token_cache_size: int):
+        self.backend = backend
+        self.token_cache_size = token_cache_size
+        # токен -> (момент истечения, id пользователя)
+        self._tokens: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get_token_user_id(self, token: str) -> Optional[int]:
+        with self._lock:
+            item = self._tokens.get(token)
+            if item is None:
+                return None
+            expires_at, user_id = item
+            if expires_at <= time.time():
+                del self._tokens[token]
+                return None
+            self._tokens.move_to_end(token)
+            return user_id
+
+    def set_token_user_id(self, token: str, user_id: int, expires_at: float) -> None:
+        with self._lock:
+            self._tokens[token] = (expires_at, user_id)
+            self._tokens.move_to_end(token)
+            while len(self._tokens) > self.token_cache_size:
+                self._tokens.popitem(last=False)
+
+    def invalidate_token(self, token: str) -> None:
+        with self._lock:
+            self._tokens.pop(token, None)
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(f"user:{user_id}")
+        except Exception:
+            # Недоступный кэш не должен ломать аутентификацию
+            self.errors += 1
+            return None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        fields = json.loads(value)
+        for name in ("created_at", "updated_at"):
+            if fields[name] is not None:
+                fields[name] = datetime.fromisoformat(fields[name])
+        return User(**fields)
+
+    def set_user(self, user: User) -> None:
+        if self.backend is None:
+            return
+        fields = {name: getattr(user, name) for name in USER_FIELDS}
+        for name in ("created_at", "updated_at"):
+            if fields[name] is not None:
+                fields[name] = fields[name].isoformat()
+        try:
+            self.backend.set(f"user:{user.id}", json.dumps(fields))
+        except Exception:
+            self.errors += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        if self.backend is None:
+            return
+        try:
+            self.backend.delete(f"user:{user_id}")
+        except Exception:
+            self.errors += 1
+
+
+def create_user_cache_backend():
+    if settings.user_cache_backend == "redis":
+        return RedisCacheBackend(settings.redis_url, settings.user_cache_ttl)
+    if settings.user_cache_backend == "memory":
+        return InMemoryCacheBackend(settings.user_cache_size, settings.user_cache_ttl)
+    return None
+
+
+user_cache = UserCache(create_user_cache_backend(), settings.token_cache_size)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_changed_user(mapper, connection, target: User) -> None:
+    # Любое изменение пользователя через ORM сбрасывает его запись в кэше
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Синхронная сессия вне цикла событий - можно обратиться к бэкенду сразу
+        user_cache.invalidate_user(target.id)
+        return
+    # Сброс внутри AsyncSession выполняется в потоке цикла событий - уводим вызов бэкенда в пул
+    loop.run_in_executor(None, user_cache.invalidate_user, target.id)
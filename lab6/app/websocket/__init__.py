@@ -1,3 +1,4 @@
 from .manager import websocket_manager
+from .pubsub import notification_bridge
 
-__all__ = ["websocket_manager"] 
\ No newline at end of file
+__all__ = ["websocket_manager", "notification_bridge"] 
\ No newline at end of file
@@ -1,42 +1,163 @@
-from typing import Dict, List
-from fastapi import WebSocket
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from fastapi import WebSocket, status
+from app.core.config import settings
 import json
 import asyncio
 
 
+class ConnectionWriter:
+    """Ограниченная очередь исходящих сообщений соединения и задача, которая их пишет.
+
+    Медленный клиент задерживает только свою очередь. При переполнении сначала
+    выбрасывается самое старое обновление прогресса; если выбрасывать нечего,
+    соединение закрывается.
+    """
+
+    def __init__(self, manager: "WebSocketManager", websocket: WebSocket, user_id: int, max_queue: int):
+        self.manager = manager
+        self.websocket = websocket
+        self.user_id = user_id
+        self.max_queue = max_queue
+        # Элементы очереди: [ключ слияния или None, текст]
+        self.queue: Deque[list] = deque()
+        # Ожидающие отправки обновления прогресса по ключу - новое заменяет старое на месте
+        self.pending_progress: Dict[str, list] = {}
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.task = asyncio.create_task(self._run())
+
+    def put(self, text: str, coalesce_key: Optional[str] = None) -> None:
+        if self.closed:
+            return
+        if coalesce_key is not None:
+            entry = self.pending_progress.get(coalesce_key)
+            if entry is not None:
+                entry[1] = text
+                self.manager.coalesced += 1
+                return
+        if len(self.queue) >= self.max_queue and not self._drop_oldest_progress():
+            # Клиент не успевает даже за важными сообщениями - отключаем его
+            self.manager.overflow_disconnects += 1
+            self.close(status.WS_1013_TRY_AGAIN_LATER)
+            return
+        entry = [coalesce_key, text]
+        self.queue.append(entry)
+        if coalesce_key is not None:
+            self.pending_progress[coalesce_key] = entry
+        self.ready.set()
+
+    def _drop_oldest_progress(self) -> bool:
+        for entry in self.queue:
+            if entry[0] is not None:
+                self.queue.remove(entry)
+                del self.pending_progress[entry[0]]
+                self.manager.dropped += 1
+                return True
+        return False
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                if not self.queue:
+                    self.ready.clear()
+                    await self.ready.wait()
+                    continue
+                coalesce_key, text = self.queue.popleft()
+                if coalesce_key is not None:
+                    self.pending_progress.pop(coalesce_key, None)
+                await asyncio.wait_for(self.websocket.send_text(text), settings.ws_send_timeout)
+                self.manager.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # Отправка не удалась или зависла - соединение больше не используем
+            self.manager.dropped += len(self.queue)
+            self.queue.clear()
+            self.manager.disconnect(self.websocket, self.user_id)
+
+    def close(self, code: int) -> None:
+        self.closed = True
+        self.manager.dropped += len(self.queue)
+        self.queue.clear()
+        self.pending_progress.clear()
+        self.manager.disconnect(self.websocket, self.user_id)
+        asyncio.create_task(self._close_websocket(code))
+
+    async def _close_websocket(self, code: int) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
 class WebSocketManager:
     def __init__(self):
-        self.active_connections: Dict[int, List[WebSocket]] = {}
+        self.active_connections: Dict[int, Dict[WebSocket, ConnectionWriter]] = {}
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.overflow_disconnects = 0
 
     async def connect(self, websocket: WebSocket, user_id: int):
         await websocket.accept()
         if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+            self.active_connections[user_id] = {}
+        self.active_connections[user_id][websocket] = ConnectionWriter(
+            self, websocket, user_id, settings.ws_queue_size
+        )
 
     def disconnect(self, websocket: WebSocket, user_id: int):
         if user_id in self.active_connections:
-            if websocket in self.active_connections[user_id]:
-                self.active_connections[user_id].remove(websocket)
+            writer = self.active_connections[user_id].pop(websocket, None)
+            if writer is not None:
+                writer.closed = True
+                if writer.task is not asyncio.current_task():
+                    writer.task.cancel()
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
 
-    async def send_message_to_user(self, user_id: int, message: dict):
-        if user_id in self.active_connections:
-            disconnected_websockets = []
-            for websocket in self.active_connections[user_id]:
-                try:
-                    await websocket.send_text(json.dumps(message))
-                except Exception:
-                    disconnected_websockets.append(websocket)
-            
-            # Удаляем отключенные соединения
-            for websocket in disconnected_websockets:
-                self.disconnect(websocket, user_id)
+    async def send_message_to_user(self, user_id: int, message: dict, text: Optional[str] = None):
+        """Ставит сообщение в очереди всех соединений пользователя, не дожидаясь отправки"""
+        writers = self.active_connections.get(user_id)
+        if not writers:
+            return
+        # Сериализуем один раз на все соединения
+        if text is None:
+            text = json.dumps(message)
+        coalesce_key = self._coalesce_key(message)
+        for writer in list(writers.values()):
+            writer.put(text, coalesce_key)
 
     async def send_message_to_all(self, message: dict):
-        for user_id in list(self.active_connections.keys()):
-            await self.send_message_to_user(user_id, message)
+        text = json.dumps(message)
+        coalesce_key = self._coalesce_key(message)
+        for writers in list(self.active_connections.values()):
+            for writer in list(writers.values()):
+                writer.put(text, coalesce_key)
+
+    @staticmethod
+    def _coalesce_key(message: dict) -> Optional[str]:
+        # Устаревший прогресс задачи можно заменить более новым
+        if message.get("status") == "PROGRESS" and message.get("task_id"):
+            return message["task_id"]
+        return None
+
+    def get_stats(self) -> dict:
+        depths: List[int] = [
+            len(writer.queue)
+            for writers in self.active_connections.values()
+            for writer in writers.values()
+        ]
+        return {
+            "connections": len(depths),
+            "queue_depth": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "overflow_disconnects": self.overflow_disconnects,
+        }
 
 
-websocket_manager = WebSocketManager() 
\ No newline at end of file
+websocket_manager = WebSocketManager()
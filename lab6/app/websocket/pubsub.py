@@ -0,0 +1,154 @@
+import asyncio
+import fnmatch
+import json
+import logging
+import threading
+from typing import AsyncIterator, List, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Канал уведомлений пользователя; экземпляры API подписываются на шаблон
+CHANNEL_PREFIX = "ws:user:"
+CHANNEL_PATTERN = CHANNEL_PREFIX + "*"
+
+
+class InMemoryPubSubBackend:
+    """Pub/sub в памяти процесса: для тестов и запуска без Redis.
+
+    Сообщения доходят только до подписчиков того же процесса, поэтому с
+    отдельными воркерами Celery этот бэкенд не работает.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue, str]] = []
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, data: str) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue, pattern in subscribers:
+            if fnmatch.fnmatchcase(channel, pattern):
+                # Публиковать можно из любого потока - очередь читается в цикле подписчика
+                loop.call_soon_threadsafe(queue.put_nowait, (channel, data))
+
+    async def apublish(self, channel: str, data: str) -> None:
+        self.publish(channel, data)
+
+    async def listen(self, pattern: str) -> AsyncIterator[Tuple[str, str]]:
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(), pattern)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        try:
+            while True:
+                yield await subscriber[1].get()
+        finally:
+            with self._lock:
+                self._subscribers.remove(subscriber)
+
+
+class RedisPubSubBackend:
+    """Pub/sub через Redis: воркеры публикуют, каждый экземпляр API подписан один раз"""
+
+    def __init__(self, redis_url: str):
+        import redis
+
+        self.redis_url = redis_url
+        # redis-py сам пересоздает соединения после fork, так что клиент общий на процесс
+        self.client = redis.Redis.from_url(redis_url)
+        self._async_client = None
+
+    def _get_async_client(self):
+        if self._async_client is None:
+            import redis.asyncio
+
+            self._async_client = redis.asyncio.Redis.from_url(self.redis_url)
+        return self._async_client
+
+    def publish(self, channel: str, data: str) -> None:
+        self.client.publish(channel, data)
+
+    async def apublish(self, channel: str, data: str) -> None:
+        await self._get_async_client().publish(channel, data)
+
+    async def listen(self, pattern: str) -> AsyncIterator[Tuple[str, str]]:
+        pubsub = self._get_async_client().pubsub()
+        await pubsub.psubscribe(pattern)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "pmessage":
+                    yield message["channel"].decode(), message["data"].decode()
+        finally:
+            await pubsub.aclose()
+
+
+class NotificationBridge:
+    """Доставляет уведомления пользователям через pub/sub.
+
+    Воркеры и обработчики публикуют событие в канал пользователя, а каждый
+    экземпляр API держит одну подписку на все каналы и передает события
+    своему WebSocketManager. Так уведомление доходит до соединения, в каком
+    бы процессе оно ни было открыто.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._listener: Optional[asyncio.Task] = None
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def publish(self, user_id: int, message: dict) -> None:
+        self.backend.publish(f"{CHANNEL_PREFIX}{user_id}", json.dumps(message))
+        self.published += 1
+
+    async def apublish(self, user_id: int, message: dict) -> None:
+        await self.backend.apublish(f"{CHANNEL_PREFIX}{user_id}", json.dumps(message))
+        self.published += 1
+
+    async def start(self, manager) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen(manager))
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _deliver(self, manager, channel: str, data: str) -> None:
+        try:
+            user_id = int(channel[len(CHANNEL_PREFIX):])
+            # Текст уже сериализован издателем - менеджер отправит его как есть
+            await manager.send_message_to_user(user_id, json.loads(data), text=data)
+            self.delivered += 1
+        except Exception:
+            # Ошибка одного сообщения не должна рвать подписку всех пользователей
+            self.dropped += 1
+            logger.exception("Failed to deliver notification from %s", channel)
+
+    async def _listen(self, manager) -> None:
+        while True:
+            try:
+                async for channel, data in self.backend.listen(CHANNEL_PATTERN):
+                    await self._deliver(manager, channel, data)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Потеря подписки не должна останавливать API - переподключаемся
+                self.errors += 1
+                logger.exception("Notification subscription failed, retrying")
+                await asyncio.sleep(settings.notification_retry_delay)
+
+
+def create_pubsub_backend():
+    if settings.notification_backend == "redis":
+        return RedisPubSubBackend(settings.redis_url)
+    return InMemoryPubSubBackend()
+
+
+notification_bridge = NotificationBridge(create_pubsub_backend())
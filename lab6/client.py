@@ -109,15 +109,46 @@ class FuzzySearchClient:
             print("Ошибка загрузки корпуса")
             return None
     
+    def upload_corpus_file(self, name: str, path: str) -> Optional[int]:
+        """Потоковая загрузка корпуса из файла без чтения его в память"""
+        if not self.token:
+            print("Необходимо войти в систему")
+            return None
+        
+        url = f"{self.api_url}/upload_corpus_stream"
+        headers = {"Content-Type": "text/plain; charset=utf-8", "Authorization": f"Bearer {self.token}"}
+        try:
+            with open(path, "rb") as f:
+                response = requests.post(url, headers=headers, params={"corpus_name": name}, data=f)
+            response.raise_for_status()
+        except (OSError, requests.exceptions.RequestException) as e:
+            print(f"Ошибка загрузки корпуса: {e}")
+            return None
+        
+        corpus_id = response.json()["corpus_id"]
+        print(f"Корпус успешно загружен! ID: {corpus_id}")
+        return corpus_id
+    
     def get_corpuses(self) -> Optional[list]:
         """Получение списка корпусов"""
         if not self.token:
             print("Необходимо войти в систему")
             return None
         
-        result = self._make_request("GET", "corpuses")
-        if result and "corpuses" in result:
-            corpuses = result["corpuses"]
+        corpuses = []
+        cursor = None
+        while True:
+            # Список отдается страницами - идем по next_cursor до конца
+            result = self._make_request("GET", "corpuses" if cursor is None else f"corpuses?cursor={cursor}")
+            if not result or "corpuses" not in result:
+                corpuses = None
+                break
+            corpuses.extend(result["corpuses"])
+            cursor = result.get("next_cursor")
+            if cursor is None:
+                break
+        
+        if corpuses is not None:
             print("Доступные корпусы:")
             for corpus in corpuses:
                 print(f"  ID: {corpus['id']}, Название: {corpus['name']}")
@@ -126,13 +157,13 @@ class FuzzySearchClient:
             print("Ошибка получения списка корпусов")
             return None
     
-    def search_sync(self, word: str, algorithm: str, corpus_id: int) -> Optional[Dict]:
+    def search_sync(self, word: str, algorithm: str, corpus_id: int, engine: str = "brute_force") -> Optional[Dict]:
         """Синхронный поиск"""
         if not self.token:
             print("Необходимо войти в систему")
             return None
         
-        data = {"word": word, "algorithm": algorithm, "corpus_id": corpus_id}
+        data = {"word": word, "algorithm": algorithm, "corpus_id": corpus_id, "engine": engine}
         result = self._make_request("POST", "search_algorithm", data)
         
         if result:
@@ -144,13 +175,31 @@ class FuzzySearchClient:
             print("Ошибка поиска")
             return None
     
-    def search_async(self, word: str, algorithm: str, corpus_id: int) -> Optional[str]:
+    def search_batch(self, words: list, algorithm: str, corpus_id: int, engine: str = "brute_force") -> Optional[Dict]:
+        """Синхронный поиск списка слов"""
+        if not self.token:
+            print("Необходимо войти в систему")
+            return None
+        
+        data = {"words": words, "algorithm": algorithm, "corpus_id": corpus_id, "engine": engine}
+        result = self._make_request("POST", "search_algorithm_batch", data)
+        
+        if result:
+            print(f"Результаты пакетного поиска (время выполнения: {result.get('execution_time', 0):.4f}с):")
+            for word, word_results in result.get("results", {}).items():
+                print(f"  {word}: {', '.join(res['word'] for res in word_results) or '-'}")
+            return result
+        else:
+            print("Ошибка поиска")
+            return None
+    
+    def search_async(self, word: str, algorithm: str, corpus_id: int, engine: str = "brute_force") -> Optional[str]:
         """Асинхронный поиск"""
         if not self.token:
             print("Необходимо войти в систему")
             return None
         
-        data = {"word": word, "algorithm": algorithm, "corpus_id": corpus_id}
+        data = {"word": word, "algorithm": algorithm, "corpus_id": corpus_id, "engine": engine}
         result = self._make_request("POST", "search_algorithm_async", data)
         
         if result and "task_id" in result:
@@ -161,6 +210,18 @@ class FuzzySearchClient:
             print("Ошибка запуска асинхронного поиска")
             return None
     
+    def fetch_results(self, result_ref: str) -> list:
+        """Загружает полные результаты фоновой задачи постранично"""
+        results = []
+        cursor = 0
+        while cursor is not None:
+            page = self._make_request("GET", f"search_results/{result_ref}?cursor={cursor}&limit=1000")
+            if not page:
+                break
+            results.extend(page["results"])
+            cursor = page.get("next_cursor")
+        return results
+    
     async def listen_websocket(self):
         """Прослушивание WebSocket уведомлений"""
         if not self.token:
@@ -198,11 +259,18 @@ class FuzzySearchClient:
         
         elif status == "COMPLETED":
             execution_time = data.get("execution_time", 0)
-            results = data.get("results", [])
+            results = data.get("results")
+            batch_results = data.get("batch_results")
+            if results is None and batch_results is None and data.get("result_ref"):
+                # Большие результаты не передаются через WebSocket - забираем по ссылке
+                results = await asyncio.to_thread(self.fetch_results, data["result_ref"])
             print(f"\n[{task_id}] Поиск завершен! Время выполнения: {execution_time:.4f}с")
             print("Результаты:")
-            for res in results:
-                print(f"  Слово: {res['word']}, Расстояние: {res['distance']}")
+            for query, word_results in (batch_results or {}).items():
+                print(f"  {query}: {', '.join(res['word'] for res in word_results) or '-'}")
+            for res in results or []:
+                prefix = f"{res['query']}: " if res.get("query") else ""
+                print(f"  {prefix}Слово: {res['word']}, Расстояние: {res['distance']}")
         
         elif status == "ERROR":
             print(f"\n[{task_id}] Ошибка при выполнении поиска")
@@ -216,8 +284,8 @@ class FuzzySearchClient:
         print("  me - Информация о пользователе")
         print("  upload <name> <text> - Загрузка корпуса")
         print("  corpuses - Список корпусов")
-        print("  search <word> <algorithm> <corpus_id> - Синхронный поиск")
-        print("  search_async <word> <algorithm> <corpus_id> - Асинхронный поиск")
+        print("  search <word> <algorithm> <corpus_id> [engine] - Синхронный поиск")
+        print("  search_async <word> <algorithm> <corpus_id> [engine] - Асинхронный поиск")
         print("  listen - Прослушивание WebSocket уведомлений")
         print("  quit - Выход")
         print()
@@ -244,12 +312,14 @@ class FuzzySearchClient:
                     self.upload_corpus(name, text)
                 elif cmd == "corpuses":
                     self.get_corpuses()
-                elif cmd == "search" and len(command) == 4:
+                elif cmd == "search" and len(command) in (4, 5):
                     word, algorithm, corpus_id = command[1], command[2], int(command[3])
-                    self.search_sync(word, algorithm, corpus_id)
-                elif cmd == "search_async" and len(command) == 4:
+                    engine = command[4] if len(command) == 5 else "brute_force"
+                    self.search_sync(word, algorithm, corpus_id, engine)
+                elif cmd == "search_async" and len(command) in (4, 5):
                     word, algorithm, corpus_id = command[1], command[2], int(command[3])
-                    self.search_async(word, algorithm, corpus_id)
+                    engine = command[4] if len(command) == 5 else "brute_force"
+                    self.search_async(word, algorithm, corpus_id, engine)
                 elif cmd == "listen":
                     asyncio.run(self.listen_websocket())
                 else:
@@ -1,12 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import auth, corpus, search, websocket
-from app.db.database import engine
+from app.db.database import engine, async_engine
 from app.models import User, Corpus
+from app.services.parallel_search import sharded_search_pool
+from app.services.search_executor import search_executor
+from app.services.password_hasher import password_hasher
+from app.websocket import websocket_manager, notification_bridge
 
 # Создаем таблицы в базе данных
 User.metadata.create_all(bind=engine)
 Corpus.metadata.create_all(bind=engine)
+# create_all не добавляет новые индексы к уже существующим таблицам
+for index in Corpus.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
 
 app = FastAPI(
     title="Fuzzy Search API",
@@ -35,6 +42,29 @@ def read_root():
     return {"message": "Fuzzy Search API (Full Version)", "version": "2.0.0"}
 
 
+@app.on_event("startup")
+async def start_notification_bridge():
+    # Одна подписка на экземпляр API: события воркеров уходят в локальные WebSocket-соединения
+    await notification_bridge.start(websocket_manager)
+
+
+@app.on_event("shutdown")
+async def stop_notification_bridge():
+    await notification_bridge.stop()
+
+
+@app.on_event("shutdown")
+def shutdown_search_pool():
+    sharded_search_pool.shutdown()
+    search_executor.shutdown(wait=False)
+    password_hasher.shutdown()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
+
+
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
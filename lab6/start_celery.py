@@ -1,17 +1,44 @@
 #!/usr/bin/env python3
 """
 Скрипт для запуска Celery worker
+
+Каждая очередь обслуживается своим воркером:
+    python start_celery.py fast   # небольшие поиски, несколько процессов
+    python start_celery.py bulk   # полный просмотр больших корпусов
 """
 
 import os
 import sys
 from app.celery.celery_app import celery_app
+from app.core.config import settings
+
+# solo выполняет одну задачу за раз; на Windows prefork недоступен - используем потоки
+FAST_POOL = "threads" if sys.platform == "win32" else "prefork"
+# Процессы prefork - демоны и не могут запускать свои пулы, поэтому задачи engine="parallel"
+# (их всегда получает медленная очередь) выполняются в solo-воркере
+BULK_POOL = "solo"
+
+# Очередь, пул, число процессов и сколько задач процесс берет заранее
+LANES = {
+    "fast": (settings.fast_queue, FAST_POOL, settings.fast_lane_concurrency, settings.fast_lane_prefetch),
+    "bulk": (settings.bulk_queue, BULK_POOL, settings.bulk_lane_concurrency, settings.bulk_lane_prefetch),
+}
 
 if __name__ == "__main__":
+    lane = sys.argv[1] if len(sys.argv) > 1 else "fast"
+    if lane not in LANES:
+        sys.exit(f"Неизвестная очередь: {lane}. Доступны: {', '.join(LANES)}")
+    queue, pool, concurrency, prefetch = LANES[lane]
+
     # Запускаем Celery worker
     celery_app.worker_main([
         'worker',
         '--loglevel=info',
-        '--concurrency=1',
-        '--pool=solo'  # Для Windows совместимости
-    ]) 
\ No newline at end of file
+        f'--hostname={lane}@%h',
+        f'--queues={queue}',
+        f'--concurrency={concurrency}',
+        f'--prefetch-multiplier={prefetch}',
+        f'--pool={pool}',
+        # Долгая задача не задерживает заранее взятые короткие
+        '-O', 'fair'
+    ])